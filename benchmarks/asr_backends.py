@@ -0,0 +1,152 @@
+"""
+ASR backend benchmark: transcribes one fixed local clip with each backend and
+reports load time, real-time factor (transcription time / audio duration)
+and word error rate against a reference transcript.
+
+    python benchmarks/asr_backends.py
+    python benchmarks/asr_backends.py --backend whisper --backend faster-whisper --model small
+
+The clip and its reference are not shipped; put a short lecture excerpt at
+benchmarks/clips/sample.flac and its hand-checked text at benchmarks/clips/sample.txt.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import typer
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+DEFAULT_CLIP = PROJECT_ROOT / "benchmarks" / "clips" / "sample.flac"
+
+app = typer.Typer()
+
+
+def _print(message: str) -> None:
+    print(f"[asr] {message}")
+
+
+def normalize(text: str) -> List[str]:
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """Word-level Levenshtein distance divided by the reference length."""
+    ref = normalize(reference)
+    hyp = normalize(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def benchmark_backend(
+    backend: str,
+    model: str,
+    audio,
+    reference: Optional[str],
+    repeat: int,
+    device: Optional[str] = None,
+    dtype: Optional[str] = None,
+) -> dict:
+    from retention.asr.transcribe import default_device, get_backend, registry
+    from retention.asr.vad import SAMPLE_RATE
+
+    engine = get_backend(backend)
+    device = device or default_device()
+    dtype = dtype or engine.default_dtype(device)
+
+    started = time.perf_counter()
+    loaded = registry.get(model, device=device, dtype=dtype, backend=backend)
+    load_seconds = time.perf_counter() - started
+
+    # One untimed pass so lazy kernel setup isn't billed to the first run
+    loaded.transcribe(audio[: SAMPLE_RATE * 5], fp16=dtype == "float16")
+
+    timings = []
+    text = ""
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        result = loaded.transcribe(audio, fp16=dtype == "float16", temperature=0.0)
+        timings.append(time.perf_counter() - started)
+        text = str(result.get("text", "")).strip()
+
+    registry.release(model, device=device, dtype=dtype, backend=backend)
+    duration = len(audio) / SAMPLE_RATE
+    best = min(timings)
+    return {
+        "backend": backend,
+        "model": model,
+        "device": device,
+        "dtype": dtype,
+        "load_seconds": round(load_seconds, 3),
+        "transcribe_seconds": round(best, 3),
+        "rtf": round(best / duration, 4),
+        "wer": None if reference is None else round(word_error_rate(reference, text), 4),
+        "text": text,
+    }
+
+
+@app.command()
+def run(
+    clip: Path = DEFAULT_CLIP,
+    reference: Optional[Path] = None,
+    backend: List[str] = typer.Option(["whisper", "faster-whisper"]),
+    model: str = "base",
+    repeat: int = 3,
+    output: Optional[Path] = None,
+):
+    """
+    Benchmark each backend on the same clip. The reference defaults to the
+    clip's .txt sibling; without one only RTF is reported.
+    """
+    from retention.asr.audio import load_audio
+    from retention.asr.vad import SAMPLE_RATE
+
+    if not clip.exists():
+        _print(f"Benchmark clip not found: {clip}")
+        raise typer.Exit(1)
+    reference = reference or clip.with_suffix(".txt")
+    reference_text = reference.read_text(encoding="utf-8") if reference.exists() else None
+    if reference_text is None:
+        _print(f"No reference transcript at {reference}; WER will be skipped")
+
+    audio = load_audio(clip)
+    _print(f"{clip.name}: {len(audio) / SAMPLE_RATE:.1f}s of audio")
+
+    results = []
+    for name in backend:
+        try:
+            stats = benchmark_backend(name, model, audio, reference_text, repeat)
+        except (RuntimeError, ValueError) as exc:
+            _print(f"{name:16s} skipped: {exc}")
+            continue
+        results.append(stats)
+        wer = "n/a" if stats["wer"] is None else f"{stats['wer']:.1%}"
+        _print(
+            f"{name:16s} {stats['dtype']:8s} load {stats['load_seconds']:6.2f}s  "
+            f"RTF {stats['rtf']:.3f}  WER {wer}"
+        )
+
+    if output is not None:
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        _print(f"Results written to {output}")
+    if not results:
+        raise typer.Exit(1)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,109 @@
+"""
+Startup benchmark: records `python -X importtime` for each entry point and
+fails when an entry point exceeds its budget or pulls in a heavy dependency
+that should only load on first use.
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --repeat 5 --output-dir build/importtime
+"""
+
+from __future__ import annotations
+
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+import typer
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Budgets are cumulative import time of the entry module in milliseconds
+ENTRY_POINTS = {
+    "retention.cli": 600,
+    "retention.gui.main": 1500,
+    "retention.validation": 400,
+    "retention.nlp.chunk": 400,
+    "retention.nlp.summarize": 450,
+    "retention.nlp.flashcards": 450,
+    "retention.recording.SysAudio": 700,
+}
+
+# Nothing on the startup path should import these; they load on first use
+DEFERRED_MODULES = ("torch", "whisper", "faster_whisper", "ctranslate2", "tiktoken", "openai")
+
+app = typer.Typer()
+
+
+def _print(message: str) -> None:
+    print(f"[importtime] {message}")
+
+
+def measure(module: str) -> tuple[float, set[str], str]:
+    """Import `module` in a fresh interpreter and return (ms, imported modules, raw log)."""
+    cmd = [sys.executable, "-X", "importtime", "-c", f"import {module}"]
+    result = subprocess.run(cmd, cwd=PROJECT_ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    cumulative_us = None
+    imported = set()
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [part.strip() for part in line[len("import time:"):].split("|")]
+        if len(parts) != 3 or not parts[1].isdigit():
+            continue
+        name = parts[2].strip()
+        imported.add(name.split(".")[0])
+        if name == module:
+            cumulative_us = int(parts[1])
+
+    if cumulative_us is None:
+        raise RuntimeError(f"No importtime entry found for {module}")
+    return cumulative_us / 1000.0, imported, result.stderr
+
+
+@app.command()
+def run(repeat: int = 3, output_dir: str = "build/importtime", scale: float = 1.0):
+    """
+    Measure every entry point and exit non-zero when a budget is exceeded.
+    `scale` multiplies every budget, e.g. 2.0 on slow CI machines.
+    """
+    out_dir = PROJECT_ROOT / output_dir
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    failures = []
+    for module, budget_ms in ENTRY_POINTS.items():
+        timings = []
+        imported = set()
+        for attempt in range(max(1, repeat)):
+            elapsed_ms, imported, raw = measure(module)
+            timings.append(elapsed_ms)
+            (out_dir / f"{module}.{attempt}.log").write_text(raw, encoding="utf-8")
+
+        # Median keeps one cold-cache outlier from failing the run
+        median_ms = statistics.median(timings)
+        limit_ms = budget_ms * scale
+        status = "ok" if median_ms <= limit_ms else "OVER"
+        _print(f"{module:32s} {median_ms:8.1f} ms  (budget {limit_ms:.0f} ms)  {status}")
+
+        if median_ms > limit_ms:
+            failures.append(f"{module} took {median_ms:.1f} ms, budget is {limit_ms:.0f} ms")
+
+        leaked = sorted(name for name in DEFERRED_MODULES if name in imported)
+        if leaked:
+            failures.append(f"{module} imports {', '.join(leaked)} at startup")
+
+    _print(f"Raw logs written to {out_dir}")
+
+    if failures:
+        for failure in failures:
+            _print(f"FAIL: {failure}")
+        raise typer.Exit(1)
+    _print("All entry points within budget.")
+
+
+if __name__ == "__main__":
+    app()
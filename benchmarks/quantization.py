@@ -0,0 +1,90 @@
+"""
+Quantization benchmark: transcribes the fixed ASR benchmark clip on CPU with
+the fp32 Whisper model and with its dynamic int8 version, then reports the
+speedup, the WER of each against the reference and how far the int8 text
+drifts from the fp32 text.
+
+    python benchmarks/quantization.py
+    python benchmarks/quantization.py --model small --fresh
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+from typing import Optional
+
+import typer
+
+from asr_backends import DEFAULT_CLIP, benchmark_backend, word_error_rate
+
+app = typer.Typer()
+
+
+def _print(message: str) -> None:
+    print(f"[quantize] {message}")
+
+
+@app.command()
+def run(
+    clip: Path = DEFAULT_CLIP,
+    reference: Optional[Path] = None,
+    model: str = "base",
+    repeat: int = 3,
+    fresh: bool = False,
+    output: Optional[Path] = None,
+):
+    """
+    Compare fp32 and int8 CPU inference. With `fresh`, cached quantized
+    weights are deleted first so the int8 load time includes quantization.
+    """
+    from retention.asr.audio import load_audio
+    from retention.asr.quantize import clear_quantized, configure_torch_threads, load_quantized_whisper
+
+    if not clip.exists():
+        _print(f"Benchmark clip not found: {clip}")
+        raise typer.Exit(1)
+    reference = reference or clip.with_suffix(".txt")
+    reference_text = reference.read_text(encoding="utf-8") if reference.exists() else None
+
+    if fresh:
+        clear_quantized()
+    configure_torch_threads()
+    audio = load_audio(clip)
+
+    fp32 = benchmark_backend("whisper", model, audio, reference_text, repeat, device="cpu", dtype="float32")
+    int8 = benchmark_backend("whisper", model, audio, reference_text, repeat, device="cpu", dtype="int8")
+
+    # Second int8 load: comes from the on-disk cache, no quantization
+    started = time.perf_counter()
+    load_quantized_whisper(model)
+    cached_load = time.perf_counter() - started
+
+    speedup = fp32["transcribe_seconds"] / max(int8["transcribe_seconds"], 1e-9)
+    drift = word_error_rate(fp32["text"], int8["text"])
+    for stats in (fp32, int8):
+        wer = "n/a" if stats["wer"] is None else f"{stats['wer']:.1%}"
+        _print(f"{stats['dtype']:8s} load {stats['load_seconds']:6.2f}s  RTF {stats['rtf']:.3f}  WER {wer}")
+    _print(f"int8 load from cache: {cached_load:.2f}s")
+    _print(f"speedup: {speedup:.2f}x")
+    if fp32["wer"] is not None:
+        _print(f"WER delta: {int8['wer'] - fp32['wer']:+.1%}")
+    _print(f"int8 vs fp32 text: {drift:.1%} word difference")
+
+    if output is not None:
+        summary = {
+            "fp32": fp32,
+            "int8": int8,
+            "int8_cached_load_seconds": round(cached_load, 3),
+            "speedup": round(speedup, 3),
+            "wer_delta": None if fp32["wer"] is None else round(int8["wer"] - fp32["wer"], 4),
+            "text_drift": round(drift, 4),
+        }
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+        _print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,137 @@
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+
+from ..recording.dsp import StreamResampler, downmix
+from .vad import SAMPLE_RATE
+
+# Containers libsndfile can't open; these still go through ffmpeg
+FFMPEG_SUFFIXES = {".mp4", ".m4a", ".mp3", ".aac", ".webm"}
+
+
+def decode_soundfile(path, block_frames: int = 1 << 16) -> np.ndarray:
+    """
+    Decode a WAV/FLAC/Ogg file to 16 kHz mono float32 in-process. Blocks are
+    downmixed and resampled as they are read, so a multichannel or
+    high-rate source is never held in memory at its original size.
+    """
+    import soundfile as sf
+
+    with sf.SoundFile(str(path)) as f:
+        resampler = StreamResampler(f.samplerate, SAMPLE_RATE)
+        expected = -(-f.frames * SAMPLE_RATE // f.samplerate)
+        out = np.empty(expected, dtype=np.float32)
+        filled = 0
+        for block in f.blocks(blocksize=block_frames, dtype="float32", always_2d=True):
+            converted = resampler.process(downmix(block))
+            out[filled : filled + len(converted)] = converted
+            filled += len(converted)
+        tail = resampler.flush()
+        out[filled : filled + len(tail)] = tail
+        filled += len(tail)
+    return out[:filled]
+
+
+def decode_ffmpeg(path) -> np.ndarray:
+    import whisper
+
+    return whisper.load_audio(str(path))
+
+
+def load_audio(path) -> np.ndarray:
+    """
+    Load audio as 16 kHz mono float32 for Whisper. Anything libsndfile reads
+    (our own WAV/FLAC/Opus recordings included) is decoded in-process; ffmpeg
+    is only spawned for compressed containers like mp4/m4a/mp3.
+    """
+    path = Path(path)
+    if path.suffix.lower() not in FFMPEG_SUFFIXES:
+        try:
+            return decode_soundfile(path)
+        except Exception as exc:
+            print(f"In-process decode of {path.name} failed ({exc}); using ffmpeg")
+    return decode_ffmpeg(path)
+
+
+def _with_tail(parts, resampler):
+    # Resampled blocks followed by the filter's held-back tail
+    yield from parts
+    yield resampler.flush()
+
+
+def _soundfile_windows(path, window_samples: int, block_frames: int = 1 << 16) -> Iterator[np.ndarray]:
+    import soundfile as sf
+
+    with sf.SoundFile(str(path)) as f:
+        resampler = StreamResampler(f.samplerate, SAMPLE_RATE)
+        window = np.empty(window_samples, dtype=np.float32)
+        filled = 0
+        blocks = f.blocks(blocksize=block_frames, dtype="float32", always_2d=True)
+        for converted in _with_tail((resampler.process(downmix(block)) for block in blocks), resampler):
+            while len(converted):
+                take = min(window_samples - filled, len(converted))
+                window[filled : filled + take] = converted[:take]
+                filled += take
+                converted = converted[take:]
+                if filled == window_samples:
+                    yield window.copy()
+                    filled = 0
+        if filled:
+            yield window[:filled].copy()
+
+
+def _ffmpeg_windows(path, window_samples: int) -> Iterator[np.ndarray]:
+    # One ffmpeg process for the whole file; we pull a window at a time from its stdout
+    if shutil.which("ffmpeg") is None:
+        raise RuntimeError("ffmpeg is required to decode this file")
+    cmd = [
+        "ffmpeg", "-nostdin", "-threads", "0", "-i", str(path),
+        "-vn", "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "-loglevel", "error", "-",
+    ]
+    # stderr goes to a file: a pipe nobody drains until EOF can fill up and stall ffmpeg
+    errors = tempfile.TemporaryFile()
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=errors)
+    window_bytes = window_samples * 2
+    try:
+        while True:
+            data = process.stdout.read(window_bytes)
+            if not data:
+                break
+            data = data[: len(data) - len(data) % 2]
+            yield np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
+        if process.wait() != 0:
+            errors.seek(0)
+            error = errors.read().decode(errors="replace").strip()
+            raise RuntimeError(f"ffmpeg failed to decode {Path(path).name}: {error}")
+    finally:
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+        process.stdout.close()
+        errors.close()
+
+
+def iter_audio_windows(path, window_seconds: float) -> Iterator[np.ndarray]:
+    """
+    Decode a file as consecutive 16 kHz mono float32 windows of
+    `window_seconds` (the last one shorter). Peak memory depends on the
+    window size, not the file length, so multi-hour recordings and videos
+    can be processed without loading them whole.
+    """
+    path = Path(path)
+    window_samples = max(1, int(window_seconds * SAMPLE_RATE))
+    if path.suffix.lower() not in FFMPEG_SUFFIXES:
+        try:
+            import soundfile as sf
+
+            sf.info(str(path))
+        except Exception as exc:
+            print(f"In-process decode of {path.name} failed ({exc}); using ffmpeg")
+        else:
+            yield from _soundfile_windows(path, window_samples)
+            return
+    yield from _ffmpeg_windows(path, window_samples)
@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+# Bump when the stored result format or the transcription pipeline changes meaningfully
+CACHE_VERSION = 1
+DEFAULT_CACHE_DIR = Path.home() / ".retention_pipeline" / "transcription_cache"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def hash_file(path, block_size: int = 1 << 20) -> str:
+    """Streaming BLAKE2b of the file contents; memory use is one block."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class TranscriptionCache:
+    """
+    Transcription results on disk, keyed by the audio content hash plus model
+    name and decode options. Entries are JSON files whose mtime records last
+    use; once the directory grows past `max_bytes` the least recently used
+    entries are deleted.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # (path, size, mtime) -> content hash, so one run doesn't hash a file twice
+        self._hashes = {}
+
+    def _content_hash(self, path) -> str:
+        stat = os.stat(path)
+        memo_key = (str(Path(path).resolve()), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            cached = self._hashes.get(memo_key)
+        if cached is None:
+            cached = hash_file(path)
+            with self._lock:
+                self._hashes[memo_key] = cached
+        return cached
+
+    def key(self, path, name: str, **options) -> str:
+        params = json.dumps({"model": name, "version": CACHE_VERSION, **options}, sort_keys=True, default=str)
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(self._content_hash(path).encode())
+        digest.update(params.encode())
+        return digest.hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, path, name: str, **options) -> Optional[dict]:
+        entry = self._entry_path(self.key(path, name, **options))
+        try:
+            result = json.loads(entry.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        # Touch so eviction sees this entry as recently used
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+        self.hits += 1
+        return result
+
+    def put(self, path, name: str, result: dict, **options):
+        entry = self._entry_path(self.key(path, name, **options))
+        self.directory.mkdir(parents=True, exist_ok=True)
+        temp = entry.with_name(f"{entry.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        temp.write_text(json.dumps(result, ensure_ascii=False), encoding="utf-8")
+        temp.replace(entry)
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        total = 0
+        for entry in self.directory.glob("*.json"):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+            total += stat.st_size
+        entries.sort()
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            entry.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self):
+        for entry in self.directory.glob("*.json"):
+            entry.unlink(missing_ok=True)
+
+    def stats(self) -> dict:
+        entries = list(self.directory.glob("*.json")) if self.directory.exists() else []
+        return {
+            "entries": len(entries),
+            "bytes": sum(entry.stat().st_size for entry in entries),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+_default_cache = None
+
+
+def get_cache() -> TranscriptionCache:
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = TranscriptionCache()
+    return _default_cache
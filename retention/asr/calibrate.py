@@ -0,0 +1,138 @@
+import json
+import os
+import platform
+import time
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+
+from .constants import AUTO_MODEL, CANDIDATE_MODELS, DEFAULT_RTF_BUDGET
+from .transcribe import DEFAULT_MODEL, default_device, get_backend, registry
+from .vad import SAMPLE_RATE
+
+CALIBRATION_CLIP = Path(__file__).parent / "assets" / "calibration.flac"
+CALIBRATION_SECONDS = 30.0
+CALIBRATION_PATH = Path.home() / ".retention_pipeline" / "asr_calibration.json"
+
+
+def machine_key(backend: Optional[str] = None) -> str:
+    """Calibrations are only valid for the engine, device and CPU they were measured on."""
+    engine = get_backend(backend)
+    device = default_device()
+    return f"{engine.name}/{device}/{engine.default_dtype(device)}/{platform.machine()}x{os.cpu_count() or 1}"
+
+
+def calibration_audio(clip=None, seconds: float = CALIBRATION_SECONDS) -> np.ndarray:
+    """The speech clip to time models on: the given file or the bundled clip."""
+    from .audio import load_audio
+
+    clip = Path(clip) if clip else CALIBRATION_CLIP
+    if not clip.exists():
+        # Whisper's speed on anything but speech says nothing about lectures, so don't guess
+        raise FileNotFoundError(f"No calibration clip at {clip}; pass --clip with a recording of speech")
+    return load_audio(clip)[: int(seconds * SAMPLE_RATE)]
+
+
+def load_calibrations(path=CALIBRATION_PATH) -> dict:
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_calibration(calibration: dict, path=CALIBRATION_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    calibrations = load_calibrations(path)
+    calibrations[calibration["machine"]] = calibration
+    temp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    temp.write_text(json.dumps(calibrations, indent=2), encoding="utf-8")
+    temp.replace(path)
+
+
+def downloaded_models(backend: Optional[str] = None) -> tuple:
+    """Candidates whose weights are already on disk, so calibrating them downloads nothing."""
+    if get_backend(backend).name != "whisper":
+        return (DEFAULT_MODEL,)
+    cache_dir = Path(os.getenv("XDG_CACHE_HOME", Path.home() / ".cache")) / "whisper"
+    found = tuple(name for name in CANDIDATE_MODELS if (cache_dir / f"{name}.pt").exists())
+    return found or (DEFAULT_MODEL,)
+
+
+def calibrate(
+    models: Sequence[str] = CANDIDATE_MODELS,
+    clip=None,
+    backend: Optional[str] = None,
+    stop_rtf: float = 1.0,
+    save: bool = True,
+) -> dict:
+    """
+    Time each candidate model on the calibration clip and record its
+    real-time factor (transcription seconds per second of audio). Larger
+    models are skipped once one runs slower than `stop_rtf`.
+    """
+    backend = get_backend(backend).name
+    audio = calibration_audio(clip)
+    duration = len(audio) / SAMPLE_RATE
+    rtf = {}
+    for name in models:
+        loaded_before = registry.is_loaded(name, backend=backend)
+        model = registry.get(name, backend=backend)
+        # Short untimed pass so one-off setup isn't counted
+        model.transcribe(audio[: SAMPLE_RATE * 2], fp16=False)
+        started = time.perf_counter()
+        model.transcribe(audio, fp16=False, temperature=0.0, condition_on_previous_text=False)
+        rtf[name] = round((time.perf_counter() - started) / duration, 4)
+        print(f"Calibration: {name} runs at {rtf[name]:.3f}x real time")
+        if not loaded_before and name != DEFAULT_MODEL:
+            registry.release(name, backend=backend)
+        if rtf[name] > stop_rtf:
+            break
+
+    calibration = {
+        "machine": machine_key(backend),
+        "backend": backend,
+        "measured_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "clip": Path(clip).name if clip else CALIBRATION_CLIP.name,
+        "clip_seconds": round(duration, 1),
+        # Everything asked for, including the models skipped after a slower one
+        "models": list(models),
+        "rtf": rtf,
+    }
+    if save:
+        save_calibration(calibration)
+    return calibration
+
+
+def get_calibration(backend: Optional[str] = None) -> Optional[dict]:
+    return load_calibrations().get(machine_key(backend))
+
+
+def needs_calibration(models: Sequence[str], backend: Optional[str] = None) -> bool:
+    """True when there is no stored calibration or it predates some of `models`, e.g. ones downloaded since."""
+    calibration = get_calibration(backend)
+    if not calibration or not calibration.get("clip"):
+        return True
+    considered = calibration.get("models") or calibration.get("rtf", {})
+    return any(name not in considered for name in models)
+
+
+def select_model(budget: float = DEFAULT_RTF_BUDGET, backend: Optional[str] = None) -> str:
+    """Largest calibrated model whose RTF fits the budget; DEFAULT_MODEL until calibrated."""
+    calibration = get_calibration(backend)
+    # Calibrations without a clip were timed on a synthetic signal by older versions
+    if not calibration or not calibration.get("rtf") or not calibration.get("clip"):
+        return DEFAULT_MODEL
+    rtf = calibration["rtf"]
+    measured = [name for name in CANDIDATE_MODELS if name in rtf]
+    fitting = [name for name in measured if rtf[name] <= budget]
+    # Nothing fits: the fastest measured model is still the best option
+    return fitting[-1] if fitting else min(measured or rtf, key=rtf.get)
+
+
+def resolve_model(name: Optional[str] = None, budget: Optional[float] = None, backend: Optional[str] = None) -> str:
+    """An explicit model name wins; None or "auto" picks from the stored calibration."""
+    if name and name != AUTO_MODEL:
+        return name
+    return select_model(DEFAULT_RTF_BUDGET if budget is None else budget, backend)
@@ -0,0 +1,8 @@
+# Model-selection settings shared by the CLI, the GUI and calibrate.py; kept import-free so neither
+# entry point pays for numpy or the ASR stack just to read a default
+
+AUTO_MODEL = "auto"
+# Smallest to largest; calibration stops at the first one that can't keep up
+CANDIDATE_MODELS = ("tiny", "base", "small", "medium")
+# Transcription may take at most this fraction of the recording's length
+DEFAULT_RTF_BUDGET = 0.5
@@ -0,0 +1,115 @@
+import os
+import re
+import warnings
+from pathlib import Path
+from typing import Optional
+
+DEFAULT_QUANTIZED_DIR = Path.home() / ".retention_pipeline" / "quantized_models"
+
+# RETENTION_ASR_QUANTIZE=0 keeps CPU inference in fp32
+QUANTIZE_ON_CPU = os.environ.get("RETENTION_ASR_QUANTIZE", "1") != "0"
+
+_threads_configured = False
+
+
+def configure_torch_threads(threads: Optional[int] = None, interop_threads: Optional[int] = None):
+    """
+    Size torch's thread pools for CPU inference: intra-op threads to the core
+    count, inter-op threads small, since Whisper's graph has little to run
+    side by side and extra pools only contend for the same cores. Without
+    `threads`, an earlier explicit setting (e.g. a pool worker's share) is kept.
+    """
+    global _threads_configured
+    import torch
+
+    if threads is None and _threads_configured:
+        return
+    cores = os.cpu_count() or 1
+    torch.set_num_threads(max(1, threads or cores))
+    if not _threads_configured:
+        # Can only be set once, before torch runs any parallel work
+        try:
+            torch.set_num_interop_threads(max(1, interop_threads or min(2, cores)))
+        except RuntimeError:
+            pass
+        _threads_configured = True
+
+
+def quantize_whisper(model):
+    """Dynamic int8 quantization of every linear layer; convolutions and embeddings stay fp32."""
+    import torch
+    from torch import nn
+
+    for module in model.modules():
+        # whisper.model.Linear only adds a dtype cast; quantize_dynamic matches exact types
+        if isinstance(module, nn.Linear) and type(module) is not nn.Linear:
+            module.__class__ = nn.Linear
+    with warnings.catch_warnings():
+        # torch flags the quantized tensor API as deprecated; it is still what quantize_dynamic uses
+        warnings.simplefilter("ignore", UserWarning)
+        return torch.ao.quantization.quantize_dynamic(model.eval(), {nn.Linear}, dtype=torch.qint8)
+
+
+def _whisper_version() -> str:
+    import whisper
+
+    return getattr(whisper, "__version__", "unknown")
+
+
+def quantized_path(name: str, directory=DEFAULT_QUANTIZED_DIR) -> Path:
+    import torch
+
+    # Packed int8 weights are only valid for the torch and whisper versions that wrote them
+    slug = re.sub(r"[^\w.-]", "_", Path(name).name)
+    return Path(directory) / f"{slug}-int8-torch{torch.__version__}-whisper{_whisper_version()}.pt"
+
+
+def _build_quantized(dims: dict, name: str):
+    import whisper
+    from whisper.model import ModelDimensions, Whisper
+
+    model = Whisper(ModelDimensions(**dims))
+    # Alignment heads are a non-persistent buffer, so they aren't in the state dict
+    heads = getattr(whisper, "_ALIGNMENT_HEADS", {}).get(name)
+    if heads is not None:
+        model.set_alignment_heads(heads)
+    return quantize_whisper(model)
+
+
+def load_quantized_whisper(name: str, directory=DEFAULT_QUANTIZED_DIR):
+    """
+    Load an int8 Whisper model for CPU. The first load quantizes the fp32
+    checkpoint and saves its dims and state dict, in whisper's own checkpoint
+    layout; later loads rebuild the quantized model and read the weights back
+    with weights_only=True, so nothing in the cache file is executed.
+    """
+    import torch
+    import whisper
+
+    path = quantized_path(name, directory)
+    if path.exists():
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", UserWarning)
+                checkpoint = torch.load(path, map_location="cpu", weights_only=True)
+            model = _build_quantized(checkpoint["dims"], name)
+            model.load_state_dict(checkpoint["model_state_dict"])
+            return model.eval()
+        except Exception as exc:
+            print(f"Discarding unreadable quantized model {path.name}: {exc}")
+            path.unlink(missing_ok=True)
+
+    model = quantize_whisper(whisper.load_model(name, device="cpu"))
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        torch.save({"dims": dict(vars(model.dims)), "model_state_dict": model.state_dict()}, temp)
+        temp.replace(path)
+    except OSError as exc:
+        print(f"Could not cache quantized model: {exc}")
+    return model
+
+
+def clear_quantized(directory=DEFAULT_QUANTIZED_DIR):
+    for path in Path(directory).glob("*.pt"):
+        path.unlink(missing_ok=True)
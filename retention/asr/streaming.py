@@ -0,0 +1,222 @@
+import queue
+import threading
+from concurrent.futures import CancelledError
+from typing import Callable, Optional
+
+import numpy as np
+
+from ..recording.dsp import StreamResampler, downmix, int16_to_float
+from .transcribe import DEFAULT_MODEL, get_model
+from .vad import SAMPLE_RATE, estimate_noise_floor, find_quiet_cut, frame_energy, trim_silence
+
+_STOP = object()
+# Audio the worker may fall behind by before live transcription gives up
+DEFAULT_MAX_BACKLOG_SECONDS = 120.0
+
+
+def to_whisper_audio(block: np.ndarray, resampler: Optional[StreamResampler] = None) -> np.ndarray:
+    """Downmix to mono float32 and resample to Whisper's 16 kHz."""
+    audio = downmix(np.asarray(block))
+    if audio.dtype == np.int16:
+        audio = int16_to_float(audio)
+    audio = audio.astype(np.float32, copy=False)
+    if resampler is None or len(audio) == 0:
+        return audio
+    return resampler.process(audio)
+
+
+class StreamingTranscriber:
+    """
+    Transcribes audio while it is still being recorded. The recorder calls
+    feed() from its callback; a background thread collects fixed-size windows,
+    cuts each one at a quiet point near its end, and transcribes it. When the
+    recording stops, finish() only has the final partial window left to do.
+    If the model can't keep up and more than `max_backlog_seconds` of audio
+    queue up, live transcription stops and finish() raises, so the caller
+    transcribes the saved recording instead.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        name: str = DEFAULT_MODEL,
+        window_seconds: float = 30.0,
+        on_segment: Optional[Callable[[dict], None]] = None,
+        trim: bool = True,
+        backend: Optional[str] = None,
+        max_backlog_seconds: float = DEFAULT_MAX_BACKLOG_SECONDS,
+        **decode_options,
+    ):
+        self.sample_rate = sample_rate
+        self.name = name
+        self.backend = backend
+        self.window_samples = int(window_seconds * SAMPLE_RATE)
+        self.trim = trim
+        self.removed_seconds = 0.0
+        self._noise_floor = None
+        self.on_segment = on_segment
+        self.decode_options = decode_options
+        self.decode_options.setdefault("fp16", False)
+
+        self._blocks = queue.Queue()
+        self.max_backlog_seconds = max_backlog_seconds
+        self._queued_frames = 0
+        self.max_backlog = 0
+        self._segments = queue.Queue()
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._offset = 0
+        self._texts = []
+        self._all_segments = []
+        self._language = None
+        self._error = None
+        self._cancelled = False
+        self._thread = None
+
+    def start(self, sample_rate: Optional[int] = None):
+        # The recorder passes its resolved device rate right before capture begins
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="live-transcriber", daemon=True)
+            self._thread.start()
+        return self
+
+    def feed(self, block: np.ndarray):
+        # Called from the audio callback: enqueue only, never block
+        if self._error is None and not self._cancelled:
+            self._queued_frames += len(block)
+            if self._queued_frames > self.max_backlog_seconds * self.sample_rate:
+                # Falling further behind only grows memory; leave it to full transcription on stop
+                self._error = RuntimeError(f"fell more than {self.max_backlog_seconds:.0f}s behind the recording")
+                print(f"Live transcription stopped: {self._error}")
+                self._cancelled = True
+                self._blocks.put_nowait(_STOP)
+                return
+            self._blocks.put_nowait(block)
+            backlog = self._blocks.qsize()
+            if backlog > self.max_backlog:
+                self.max_backlog = backlog
+
+    def _run(self):
+        try:
+            model = get_model(self.name, backend=self.backend)
+            resampler = None
+            if self.sample_rate != SAMPLE_RATE:
+                resampler = StreamResampler(self.sample_rate, SAMPLE_RATE)
+            # Collect callback blocks at the device rate and convert a window at a time
+            raw = []
+            raw_frames = 0
+            window_raw = int(self.window_samples * self.sample_rate / SAMPLE_RATE)
+            while True:
+                block = self._blocks.get()
+                if self._cancelled:
+                    break
+                if block is not _STOP:
+                    self._queued_frames -= len(block)
+                    raw.append(block)
+                    raw_frames += len(block)
+                    if raw_frames < window_raw:
+                        continue
+
+                if raw:
+                    converted = to_whisper_audio(np.concatenate(raw, axis=0), resampler)
+                    self._pending = np.concatenate([self._pending, converted])
+                    raw = []
+                    raw_frames = 0
+                if block is _STOP and resampler is not None:
+                    self._pending = np.concatenate([self._pending, resampler.flush()])
+
+                while len(self._pending) >= self.window_samples and not self._cancelled:
+                    cut = self._find_cut(self._pending[: self.window_samples])
+                    self._transcribe(model, self._pending[:cut])
+                    self._pending = self._pending[cut:]
+
+                if block is _STOP:
+                    break
+
+            if len(self._pending) and not self._cancelled:
+                self._transcribe(model, self._pending)
+                self._pending = np.zeros(0, dtype=np.float32)
+        except Exception as exc:
+            print(f"Live transcription error: {exc}")
+            self._error = exc
+        finally:
+            if self._cancelled:
+                # Free whatever the callback queued before the stop
+                while not self._blocks.empty():
+                    self._blocks.get_nowait()
+            self._segments.put(_STOP)
+
+    def _find_cut(self, window: np.ndarray) -> int:
+        # Cut at a pause in the last quarter so words aren't split
+        return find_quiet_cut(window, SAMPLE_RATE)
+
+    def _transcribe(self, model, audio: np.ndarray):
+        offset = self._offset / SAMPLE_RATE
+        self._offset += len(audio)
+
+        if self.trim:
+            # A window can be all speech, so track the quietest floor seen so far
+            floor = estimate_noise_floor(frame_energy(audio, SAMPLE_RATE))
+            self._noise_floor = floor if self._noise_floor is None else min(self._noise_floor, floor)
+            audio, time_map = trim_silence(audio, SAMPLE_RATE, noise_floor_db=self._noise_floor)
+            self.removed_seconds += time_map.removed_seconds
+        if len(audio) == 0:
+            # Nothing but silence in this window; don't let Whisper invent filler
+            return
+
+        # Carry the tail of the transcript forward as context across windows
+        prompt = " ".join(self._texts)[-200:] or None
+        result = model.transcribe(audio, initial_prompt=prompt, **self.decode_options)
+        self._language = self._language or result.get("language")
+
+        text = str(result.get("text", "")).strip()
+        if text:
+            self._texts.append(text)
+
+        segments = result.get("segments", [])
+        if self.trim:
+            segments = time_map.remap_segments(segments)
+
+        for segment in segments:
+            shifted = dict(segment)
+            shifted["id"] = len(self._all_segments)
+            shifted["start"] = segment["start"] + offset
+            shifted["end"] = segment["end"] + offset
+            self._all_segments.append(shifted)
+            self._segments.put(shifted)
+            if self.on_segment is not None:
+                self.on_segment(shifted)
+
+    def segments(self):
+        """Yield transcript segments as they are produced, until finish() completes."""
+        while True:
+            segment = self._segments.get()
+            if segment is _STOP:
+                self._segments.put(_STOP)
+                return
+            yield segment
+
+    def cancel(self):
+        """Stop without transcribing what's left, e.g. when the recording is discarded."""
+        self._cancelled = True
+        self._blocks.put(_STOP)
+
+    def finish(self, timeout: Optional[float] = None) -> dict:
+        """Transcribe what's left after recording stops and return the full result; raises CancelledError after cancel()."""
+        self.start()
+        self._blocks.put(_STOP)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            # Returning now would pass off a partial transcript as the whole recording
+            raise RuntimeError(f"Live transcription did not finish within {timeout}s")
+        if self._error is not None:
+            raise RuntimeError(f"Live transcription failed: {self._error}") from self._error
+        if self._cancelled:
+            raise CancelledError()
+        return {
+            "text": " ".join(self._texts),
+            "segments": list(self._all_segments),
+            "language": self._language,
+            "removed_seconds": self.removed_seconds,
+        }
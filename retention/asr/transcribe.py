@@ -0,0 +1,695 @@
+import os
+import threading
+import time
+from concurrent.futures import CancelledError
+from typing import Callable, Optional, Protocol
+
+DEFAULT_MODEL = "base"
+DEFAULT_IDLE_TIMEOUT = 600.0
+# 20 minutes of 16 kHz float32 is about 77 MB; longer inputs are decoded window by window
+DEFAULT_WINDOW_SECONDS = 1200.0
+# How often a waiting transcription checks whether it was cancelled
+CANCEL_POLL_SECONDS = 0.25
+
+
+def default_device() -> str:
+    import torch
+
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def default_dtype(device: str) -> str:
+    # Whisper only benefits from half precision on GPU
+    return "float16" if device.startswith("cuda") else "float32"
+
+
+class ASRBackend(Protocol):
+    """
+    A speech recognition engine. load() returns a model object whose
+    transcribe(audio, **options) takes 16 kHz mono float32 and returns a
+    Whisper-style dict with `text`, `segments` and `language`.
+    """
+
+    name: str
+    # False for engines that already use every core from one process
+    supports_process_pool: bool
+
+    def default_dtype(self, device: str) -> str: ...
+
+    def load(self, model: str, device: str, dtype: str): ...
+
+
+class WhisperBackend:
+    """openai-whisper on PyTorch."""
+
+    name = "whisper"
+    supports_process_pool = True
+
+    def default_dtype(self, device: str) -> str:
+        from .quantize import QUANTIZE_ON_CPU
+
+        if device == "cpu" and QUANTIZE_ON_CPU:
+            return "int8"
+        return default_dtype(device)
+
+    def load(self, model: str, device: str, dtype: str):
+        import whisper
+
+        print(f"Loading Whisper model '{model}' on {device} ({dtype})...")
+        if device == "cpu":
+            from .quantize import configure_torch_threads
+
+            configure_torch_threads()
+        if dtype == "int8":
+            from .quantize import load_quantized_whisper
+
+            if device != "cpu":
+                raise ValueError("int8 Whisper models only run on the CPU")
+            return load_quantized_whisper(model)
+        loaded = whisper.load_model(model, device=device)
+        if dtype == "float16":
+            loaded = loaded.half()
+        return loaded
+
+
+class FasterWhisperModel:
+    """Adapts a faster_whisper.WhisperModel to the Whisper transcribe() result format."""
+
+    # openai-whisper options CTranslate2 doesn't take
+    _UNSUPPORTED_OPTIONS = ("fp16", "verbose")
+
+    def __init__(self, model):
+        self.model = model
+
+    def transcribe(self, audio, **options):
+        for option in self._UNSUPPORTED_OPTIONS:
+            options.pop(option, None)
+        segments, info = self.model.transcribe(audio, **options)
+        # faster-whisper decodes lazily; consuming the generator does the work
+        converted = [
+            {
+                "id": i,
+                "start": segment.start,
+                "end": segment.end,
+                "text": segment.text,
+                "avg_logprob": segment.avg_logprob,
+                "no_speech_prob": segment.no_speech_prob,
+            }
+            for i, segment in enumerate(segments)
+        ]
+        return {
+            "text": "".join(segment["text"] for segment in converted),
+            "segments": converted,
+            "language": info.language,
+        }
+
+
+class FasterWhisperBackend:
+    """faster-whisper (CTranslate2) with int8 weights on CPU. Optional: pip install faster-whisper."""
+
+    name = "faster-whisper"
+    supports_process_pool = False
+
+    def default_dtype(self, device: str) -> str:
+        return "float16" if device.startswith("cuda") else "int8"
+
+    def load(self, model: str, device: str, dtype: str):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError as exc:
+            raise RuntimeError("The faster-whisper backend needs `pip install faster-whisper`") from exc
+
+        print(f"Loading faster-whisper model '{model}' on {device} ({dtype})...")
+        return FasterWhisperModel(WhisperModel(model, device=device, compute_type=dtype, cpu_threads=os.cpu_count() or 0))
+
+
+BACKENDS = {backend.name: backend for backend in (WhisperBackend(), FasterWhisperBackend())}
+DEFAULT_BACKEND = "whisper"
+_default_backend = os.environ.get("RETENTION_ASR_BACKEND", DEFAULT_BACKEND)
+
+
+def set_default_backend(name: str):
+    """Pick the engine used when callers don't name one (from settings or the CLI)."""
+    global _default_backend
+    get_backend(name)
+    _default_backend = name
+
+
+def get_backend(name: Optional[str] = None) -> ASRBackend:
+    name = name or _default_backend
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown ASR backend '{name}'. Choose from: {', '.join(BACKENDS)}") from None
+
+
+class _Entry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.model = None
+        self.last_used = 0.0
+
+
+class ModelRegistry:
+    """Process-wide cache of loaded models keyed by (backend, name, device, dtype)."""
+
+    def __init__(self, idle_timeout: Optional[float] = DEFAULT_IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._reaper = None
+
+    def _resolve_key(self, name, device, dtype, backend=None):
+        backend = get_backend(backend)
+        device = device or default_device()
+        dtype = dtype or backend.default_dtype(device)
+        return backend.name, name, device, dtype
+
+    def _entry(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _Entry()
+                self._entries[key] = entry
+            return entry
+
+    def _load(self, backend, name, device, dtype):
+        return get_backend(backend).load(name, device, dtype)
+
+    def get(
+        self,
+        name: str = DEFAULT_MODEL,
+        device: Optional[str] = None,
+        dtype: Optional[str] = None,
+        backend: Optional[str] = None,
+    ):
+        """Return the model for this key, loading it on first use."""
+        key = self._resolve_key(name, device, dtype, backend)
+        entry = self._entry(key)
+
+        # Per-key lock: concurrent callers for the same model wait for one load
+        with entry.lock:
+            if entry.model is None:
+                entry.model = self._load(*key)
+            entry.last_used = time.monotonic()
+            model = entry.model
+
+        self._ensure_reaper()
+        return model
+
+    def is_loaded(
+        self,
+        name: str = DEFAULT_MODEL,
+        device: Optional[str] = None,
+        dtype: Optional[str] = None,
+        backend: Optional[str] = None,
+    ) -> bool:
+        key = self._resolve_key(name, device, dtype, backend)
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry is not None and entry.model is not None
+
+    def prewarm(
+        self,
+        name: str = DEFAULT_MODEL,
+        device: Optional[str] = None,
+        dtype: Optional[str] = None,
+        backend: Optional[str] = None,
+    ):
+        """Load a model on a daemon thread so the first transcription skips the load."""
+
+        def _run():
+            try:
+                self.get(name, device=device, dtype=dtype, backend=backend)
+            except Exception as exc:
+                print(f"Model prewarm failed: {exc}")
+
+        thread = threading.Thread(target=_run, name=f"whisper-prewarm-{name}", daemon=True)
+        thread.start()
+        return thread
+
+    def release(
+        self,
+        name: Optional[str] = None,
+        device: Optional[str] = None,
+        dtype: Optional[str] = None,
+        backend: Optional[str] = None,
+    ):
+        """Drop cached models. With no name, every model is released."""
+        with self._lock:
+            if name is None:
+                entries = list(self._entries.values())
+            else:
+                key = self._resolve_key(name, device, dtype, backend)
+                entries = [self._entries[key]] if key in self._entries else []
+
+        for entry in entries:
+            with entry.lock:
+                entry.model = None
+        self._free_device_memory()
+
+    def release_idle(self):
+        if self.idle_timeout is None:
+            return 0
+
+        now = time.monotonic()
+        released = 0
+        with self._lock:
+            entries = list(self._entries.values())
+
+        for entry in entries:
+            # Skip entries that are busy loading; they'll be checked next round
+            if not entry.lock.acquire(blocking=False):
+                continue
+            try:
+                if entry.model is not None and now - entry.last_used >= self.idle_timeout:
+                    entry.model = None
+                    released += 1
+            finally:
+                entry.lock.release()
+
+        if released:
+            print(f"Released {released} idle Whisper model(s)")
+            self._free_device_memory()
+        return released
+
+    def _free_device_memory(self):
+        try:
+            import torch
+        except ImportError:
+            return
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def _ensure_reaper(self):
+        if self.idle_timeout is None:
+            return
+        with self._lock:
+            if self._reaper is not None and self._reaper.is_alive():
+                return
+            self._reaper = threading.Thread(target=self._reap_loop, name="whisper-reaper", daemon=True)
+            self._reaper.start()
+
+    def _reap_loop(self):
+        interval = max(1.0, min(60.0, self.idle_timeout / 4))
+        while True:
+            time.sleep(interval)
+            self.release_idle()
+            with self._lock:
+                if not any(entry.model is not None for entry in self._entries.values()):
+                    self._reaper = None
+                    return
+
+
+registry = ModelRegistry()
+
+
+def get_model(
+    name: str = DEFAULT_MODEL,
+    device: Optional[str] = None,
+    dtype: Optional[str] = None,
+    backend: Optional[str] = None,
+):
+    return registry.get(name, device=device, dtype=dtype, backend=backend)
+
+
+def prewarm_model(
+    name: str = DEFAULT_MODEL,
+    device: Optional[str] = None,
+    dtype: Optional[str] = None,
+    backend: Optional[str] = None,
+):
+    return registry.prewarm(name, device=device, dtype=dtype, backend=backend)
+
+
+# --- Parallel transcription -------------------------------------------------
+
+_worker_model = None
+
+
+def _init_worker(name, threads, backend):
+    # Runs once per pool process: pin torch threads and load the model a single time
+    global _worker_model
+    from .quantize import configure_torch_threads
+
+    # Workers split the cores between them, so each keeps a single inter-op thread
+    configure_torch_threads(threads, interop_threads=1)
+    engine = get_backend(backend)
+    _worker_model = engine.load(name, "cpu", engine.default_dtype("cpu"))
+
+
+def _worker_ready():
+    return _worker_model is not None
+
+
+def _transcribe_segment(index, audio, offset, decode_options):
+    result = _worker_model.transcribe(audio, **decode_options)
+    return index, offset, result
+
+
+class TranscriberPool:
+    """
+    A process pool whose workers each hold one loaded model. The pool is kept
+    between jobs so back-to-back recordings skip the per-worker model load,
+    and is shut down after `idle_timeout` seconds without work.
+    """
+
+    def __init__(self, name: str = DEFAULT_MODEL, workers: Optional[int] = None,
+                 idle_timeout: Optional[float] = DEFAULT_IDLE_TIMEOUT, backend: Optional[str] = None):
+        self.name = name
+        # Resolved now: spawned workers don't see set_default_backend()
+        self.backend = get_backend(backend).name
+        self.cores = os.cpu_count() or 1
+        self.workers = max(1, workers or self.cores)
+        self.idle_timeout = idle_timeout
+        self._executor = None
+        self._lock = threading.Lock()
+        self._active = 0
+        self._idle_timer = None
+
+    def _ensure_executor(self):
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        if self._executor is None:
+            # One torch thread set per process scales better than many threads in one process
+            threads = max(1, self.cores // self.workers)
+            # spawn avoids forking a process that already holds torch/OpenMP state
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.name, threads, self.backend),
+            )
+        return self._executor
+
+    def _acquire(self):
+        with self._lock:
+            if self._idle_timer is not None:
+                self._idle_timer.cancel()
+                self._idle_timer = None
+            self._active += 1
+            return self._ensure_executor()
+
+    def _release(self):
+        with self._lock:
+            self._active -= 1
+            if self._active == 0 and self.idle_timeout is not None:
+                self._idle_timer = threading.Timer(self.idle_timeout, self._shutdown_if_idle)
+                self._idle_timer.daemon = True
+                self._idle_timer.start()
+
+    def _shutdown_if_idle(self):
+        with self._lock:
+            if self._active:
+                return
+            executor, self._executor = self._executor, None
+            self._idle_timer = None
+        if executor is not None:
+            print("Shutting down idle transcription workers")
+            executor.shutdown(wait=False)
+
+    def prewarm(self):
+        """Start every worker and load its model without blocking the caller."""
+        executor = self._acquire()
+        try:
+            futures = [executor.submit(_worker_ready) for _ in range(self.workers)]
+        except Exception:
+            self._release()
+            raise
+
+        remaining = len(futures)
+
+        def _done(_future):
+            nonlocal remaining
+            with self._lock:
+                remaining -= 1
+                last = remaining == 0
+            if last:
+                self._release()
+
+        for future in futures:
+            future.add_done_callback(_done)
+
+    def transcribe_segments(self, audio, bounds, sample_rate, decode_options,
+                            cancelled: Optional[Callable[[], bool]] = None):
+        from concurrent.futures import wait
+        from concurrent.futures.process import BrokenProcessPool
+
+        executor = self._acquire()
+        try:
+            futures = [
+                executor.submit(_transcribe_segment, i, audio[start:end], start / sample_rate, decode_options)
+                for i, (start, end) in enumerate(bounds)
+            ]
+            pending = set(futures)
+            while pending:
+                _, pending = wait(pending, timeout=CANCEL_POLL_SECONDS)
+                if pending and cancelled is not None and cancelled():
+                    # Segments already running finish in their workers; the rest never start
+                    for future in pending:
+                        future.cancel()
+                    raise CancelledError()
+            return [future.result() for future in futures]
+        except BrokenProcessPool:
+            # A worker died (e.g. the model failed to load); rebuild the pool next time
+            with self._lock:
+                self._executor = None
+            raise
+        finally:
+            self._release()
+
+    def shutdown(self):
+        with self._lock:
+            if self._idle_timer is not None:
+                self._idle_timer.cancel()
+                self._idle_timer = None
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(name: str = DEFAULT_MODEL, workers: Optional[int] = None, backend: Optional[str] = None) -> TranscriberPool:
+    workers = max(1, workers or os.cpu_count() or 1)
+    key = (get_backend(backend).name, name, workers)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = TranscriberPool(name, workers, backend=key[0])
+            _pools[key] = pool
+        return pool
+
+
+def _stitch(parts):
+    """Merge per-segment Whisper results, shifting timestamps by each segment offset."""
+    texts = []
+    segments = []
+    language = None
+    for _, offset, result in sorted(parts, key=lambda part: part[0]):
+        language = language or result.get("language")
+        text = str(result.get("text", "")).strip()
+        if text:
+            texts.append(text)
+        for segment in result.get("segments", []):
+            shifted = dict(segment)
+            shifted["id"] = len(segments)
+            shifted["start"] = segment["start"] + offset
+            shifted["end"] = segment["end"] + offset
+            segments.append(shifted)
+    return {"text": " ".join(texts), "segments": segments, "language": language}
+
+
+def transcribe_parallel(
+    audio,
+    name: str = DEFAULT_MODEL,
+    workers: Optional[int] = None,
+    max_segment_seconds: float = 90.0,
+    backend: Optional[str] = None,
+    cancelled: Optional[Callable[[], bool]] = None,
+    **decode_options,
+):
+    """
+    Split audio at quiet points and transcribe the segments in a process pool.
+    `audio` is a path or a 16 kHz mono float32 array. Returns a Whisper-style
+    result dict with `text`, `segments` and `language`.
+    """
+    import numpy as np
+
+    from .audio import load_audio
+    from .vad import SAMPLE_RATE, split_on_silence
+
+    if isinstance(audio, (str, os.PathLike)):
+        audio = load_audio(audio)
+    audio = np.asarray(audio, dtype=np.float32)
+
+    bounds = split_on_silence(audio, SAMPLE_RATE, max_segment_seconds=max_segment_seconds)
+    decode_options.setdefault("fp16", False)
+
+    if workers == 1 or len(bounds) == 1:
+        model = get_model(name, device="cpu", backend=backend)
+        parts = []
+        for i, (start, end) in enumerate(bounds):
+            _check_cancelled(cancelled)
+            parts.append((i, start / SAMPLE_RATE, model.transcribe(audio[start:end], **decode_options)))
+        return _stitch(parts)
+
+    pool = get_pool(name, workers, backend=backend)
+    print(f"Transcribing {len(bounds)} segments on {pool.workers} workers...")
+    parts = pool.transcribe_segments(audio, bounds, SAMPLE_RATE, decode_options, cancelled)
+    return _stitch(parts)
+
+
+def _transcribe_audio(audio, name: str, workers: Optional[int], trim: bool, backend: Optional[str] = None,
+                      cancelled: Optional[Callable[[], bool]] = None, **decode_options) -> dict:
+    from .vad import SAMPLE_RATE, trim_silence
+
+    time_map = None
+    if trim:
+        audio, time_map = trim_silence(audio, SAMPLE_RATE)
+
+    if len(audio) == 0:
+        result = {"text": "", "segments": [], "language": None}
+    elif default_device() != "cpu" or workers == 1 or not get_backend(backend).supports_process_pool:
+        result = get_model(name, backend=backend).transcribe(audio, **decode_options)
+    else:
+        result = transcribe_parallel(
+            audio, name=name, workers=workers, backend=backend, cancelled=cancelled, **decode_options
+        )
+
+    result["removed_seconds"] = 0.0
+    if time_map is not None:
+        result["segments"] = time_map.remap_segments(result.get("segments", []))
+        result["removed_seconds"] = time_map.removed_seconds
+    return result
+
+
+def _check_cancelled(cancelled: Optional[Callable[[], bool]]):
+    if cancelled is not None and cancelled():
+        raise CancelledError()
+
+
+def _with_last(items):
+    # Yield (item, is_last) so the final window isn't cut
+    iterator = iter(items)
+    try:
+        previous = next(iterator)
+    except StopIteration:
+        return
+    for item in iterator:
+        yield previous, False
+        previous = item
+    yield previous, True
+
+
+def transcribe_file(
+    path,
+    name: str = DEFAULT_MODEL,
+    workers: Optional[int] = None,
+    trim: bool = True,
+    window_seconds: float = DEFAULT_WINDOW_SECONDS,
+    cache: bool = True,
+    backend: Optional[str] = None,
+    cancelled: Optional[Callable[[], bool]] = None,
+    **decode_options,
+):
+    """
+    Transcribe a file, in parallel on CPU and with the cached model on GPU.
+    The file is decoded and transcribed `window_seconds` at a time, cut at
+    pauses, so memory stays bounded however long the recording is. With
+    `trim`, long silences are cut before decoding and segment timestamps
+    are mapped back onto the original recording. With `cache`, a file
+    already transcribed with the same model and options is not decoded again.
+    `backend` picks the ASR engine (see BACKENDS); None uses the configured default.
+    `cancelled` is polled between windows and pool segments; once it returns
+    True, CancelledError is raised.
+    """
+    backend = get_backend(backend).name
+    if not cache:
+        return _transcribe_windows(path, name, workers, trim, window_seconds, backend, cancelled, **decode_options)
+
+    from .cache import get_cache
+
+    transcription_cache = get_cache()
+    device = default_device()
+    # int8, float16 and float32 runs of one model give different text; each gets its own entry
+    options = {
+        "trim": trim,
+        "window_seconds": window_seconds,
+        "backend": backend,
+        "device": device,
+        "dtype": get_backend(backend).default_dtype(device),
+        **decode_options,
+    }
+    result = transcription_cache.get(path, name, **options)
+    if result is not None:
+        print(f"Using cached transcription for {path}")
+        return result
+
+    result = _transcribe_windows(path, name, workers, trim, window_seconds, backend, cancelled, **decode_options)
+    try:
+        transcription_cache.put(path, name, result, **options)
+    except OSError as exc:
+        print(f"Could not cache transcription: {exc}")
+    return result
+
+
+def _transcribe_windows(path, name, workers, trim, window_seconds, backend, cancelled=None, **decode_options):
+    import numpy as np
+
+    from .audio import iter_audio_windows
+    from .vad import SAMPLE_RATE, find_quiet_cut
+
+    texts = []
+    segments = []
+    language = None
+    removed_seconds = 0.0
+    offset = 0
+    carry = np.zeros(0, dtype=np.float32)
+
+    for window, last in _with_last(iter_audio_windows(path, window_seconds)):
+        _check_cancelled(cancelled)
+        audio = np.concatenate([carry, window]) if len(carry) else window
+        if last:
+            carry = np.zeros(0, dtype=np.float32)
+        else:
+            # Hold back everything after the last pause for the next window
+            cut = find_quiet_cut(audio, SAMPLE_RATE, search_fraction=0.1)
+            audio, carry = audio[:cut], audio[cut:]
+
+        result = _transcribe_audio(audio, name, workers, trim, backend, cancelled, **decode_options)
+        start = offset / SAMPLE_RATE
+        offset += len(audio)
+
+        language = language or result.get("language")
+        removed_seconds += result["removed_seconds"]
+        text = str(result.get("text", "")).strip()
+        if text:
+            texts.append(text)
+        for segment in result.get("segments", []):
+            segments.append({**segment, "id": len(segments), "start": segment["start"] + start, "end": segment["end"] + start})
+
+    if trim:
+        print(f"Trimmed {removed_seconds:.1f}s of silence")
+    return {"text": " ".join(texts), "segments": segments, "language": language, "removed_seconds": removed_seconds}
+
+
+def prewarm_transcriber(name: str = DEFAULT_MODEL, workers: Optional[int] = None, backend: Optional[str] = None):
+    """Warm whichever engine transcribe_file() will use on this machine."""
+    backend = get_backend(backend).name
+
+    def _run():
+        try:
+            if default_device() != "cpu" or workers == 1 or not get_backend(backend).supports_process_pool:
+                registry.get(name, backend=backend)
+            else:
+                get_pool(name, workers, backend=backend).prewarm()
+        except Exception as exc:
+            print(f"Model prewarm failed: {exc}")
+
+    thread = threading.Thread(target=_run, name=f"whisper-prewarm-{name}", daemon=True)
+    thread.start()
+    return thread
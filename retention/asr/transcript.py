@@ -0,0 +1,123 @@
+import json
+from pathlib import Path
+from typing import Iterator, Optional
+
+import numpy as np
+
+TRANSCRIPT_SUFFIX = ".segments.jsonl"
+INDEX_SUFFIX = ".idx.npy"
+
+SEGMENT_FIELDS = ("start", "end", "text", "avg_logprob", "no_speech_prob")
+
+# Byte offset and time span of every line, so readers can seek without parsing JSON
+INDEX_DTYPE = np.dtype([("offset", np.int64), ("start", np.float64), ("end", np.float64)])
+
+
+def transcript_path(directory, stem: str) -> Path:
+    return Path(directory) / f"{stem}{TRANSCRIPT_SUFFIX}"
+
+
+def index_path(path) -> Path:
+    path = Path(path)
+    return path.with_name(path.name + INDEX_SUFFIX)
+
+
+def compact_segment(segment: dict) -> dict:
+    # Whisper segments also carry tokens, seek, temperature...; keep what downstream uses
+    compact = {"id": int(segment.get("id", 0))}
+    for field in SEGMENT_FIELDS:
+        value = segment.get(field)
+        if field == "text":
+            value = str(value or "").strip()
+        elif value is not None:
+            value = round(float(value), 3 if field in ("start", "end") else 4)
+        compact[field] = value
+    return compact
+
+
+def result_segments(result: dict) -> list:
+    """Segments of a transcription result, or one untimed segment if it only has text."""
+    segments = result.get("segments") or []
+    if not segments and str(result.get("text", "")).strip():
+        segments = [{"id": 0, "start": 0.0, "end": 0.0, "text": result["text"]}]
+    return segments
+
+
+def write_transcript(path, segments: list) -> Path:
+    """Write segments as JSON lines plus a .idx.npy offset index next to them."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    index = np.zeros(len(segments), dtype=INDEX_DTYPE)
+    offset = 0
+    with open(path, "wb") as f:
+        for i, segment in enumerate(segments):
+            compact = compact_segment({**segment, "id": i})
+            line = (json.dumps(compact, ensure_ascii=False) + "\n").encode("utf-8")
+            f.write(line)
+            index[i] = (offset, compact["start"] or 0.0, compact["end"] or 0.0)
+            offset += len(line)
+    np.save(index_path(path), index)
+    return path
+
+
+def remove_transcript(path):
+    Path(path).unlink(missing_ok=True)
+    index_path(path).unlink(missing_ok=True)
+
+
+class TranscriptReader:
+    """
+    Lazy access to a segment transcript. Only the small index is loaded up
+    front; segments are read by seeking to their byte offset.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        try:
+            self.index = np.load(index_path(self.path))
+        except OSError:
+            self.index = self._build_index()
+
+    def _build_index(self) -> np.ndarray:
+        # Index missing (e.g. copied without it): one pass over the lines
+        rows = []
+        offset = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                segment = json.loads(line)
+                rows.append((offset, segment.get("start") or 0.0, segment.get("end") or 0.0))
+                offset += len(line)
+        return np.array(rows, dtype=INDEX_DTYPE)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def read(self, start: int = 0, stop: Optional[int] = None) -> list:
+        """Segments start..stop-1, reading only their lines."""
+        stop = len(self) if stop is None else min(stop, len(self))
+        if start >= stop:
+            return []
+        with open(self.path, "rb") as f:
+            f.seek(int(self.index["offset"][start]))
+            return [json.loads(f.readline()) for _ in range(stop - start)]
+
+    def __getitem__(self, i: int) -> dict:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.read(i, i + 1)[0]
+
+    def __iter__(self) -> Iterator[dict]:
+        with open(self.path, "rb") as f:
+            for line in f:
+                yield json.loads(line)
+
+    def between(self, start_seconds: float, end_seconds: float) -> list:
+        """Segments overlapping [start_seconds, end_seconds)."""
+        first = int(np.searchsorted(self.index["end"], start_seconds, side="right"))
+        last = int(np.searchsorted(self.index["start"], end_seconds, side="left"))
+        return self.read(first, last)
+
+    def text(self) -> str:
+        return " ".join(segment["text"] for segment in self if segment["text"])
@@ -0,0 +1,206 @@
+from typing import Optional
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+def frame_energy(audio: np.ndarray, sample_rate: int = SAMPLE_RATE, frame_ms: float = 30.0) -> np.ndarray:
+    """Per-frame RMS energy in dBFS for mono float audio."""
+    frame_len = max(1, int(sample_rate * frame_ms / 1000))
+    n_frames = len(audio) // frame_len
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.float32)
+
+    frames = audio[: n_frames * frame_len].reshape(n_frames, frame_len)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+    return 20.0 * np.log10(rms + 1e-10)
+
+
+def split_on_silence(
+    audio: np.ndarray,
+    sample_rate: int = SAMPLE_RATE,
+    max_segment_seconds: float = 90.0,
+    min_segment_seconds: float = 20.0,
+    frame_ms: float = 30.0,
+    smooth_ms: float = 400.0,
+):
+    """
+    Cut audio into segments no longer than `max_segment_seconds`, placing each
+    cut at the quietest point of the allowed window so words are not split.
+    Returns a list of (start_sample, end_sample) pairs covering the whole input.
+    """
+    total = len(audio)
+    if total == 0:
+        return []
+
+    frame_len = max(1, int(sample_rate * frame_ms / 1000))
+    energy = frame_energy(audio, sample_rate, frame_ms)
+
+    # Smooth so a cut lands in the middle of a pause, not on a single quiet frame
+    smooth_frames = max(1, int(smooth_ms / frame_ms))
+    kernel = np.ones(smooth_frames, dtype=np.float32) / smooth_frames
+    smoothed = np.convolve(energy, kernel, mode="same") if len(energy) else energy
+
+    max_frames = max(2, int(max_segment_seconds * 1000 / frame_ms))
+    min_frames = min(max_frames - 1, max(1, int(min_segment_seconds * 1000 / frame_ms)))
+
+    bounds = []
+    start_frame = 0
+    n_frames = len(smoothed)
+    while n_frames - start_frame > max_frames:
+        lo = start_frame + min_frames
+        hi = start_frame + max_frames
+        cut = lo + int(np.argmin(smoothed[lo:hi]))
+        bounds.append((start_frame * frame_len, cut * frame_len))
+        start_frame = cut
+
+    bounds.append((start_frame * frame_len, total))
+    return bounds
+
+
+def find_quiet_cut(window: np.ndarray, sample_rate: int = SAMPLE_RATE, search_fraction: float = 0.25) -> int:
+    """Sample index of the quietest 30 ms frame in the last `search_fraction` of `window`."""
+    frame_len = int(sample_rate * 0.03)
+    energy = frame_energy(window, sample_rate, 30.0)
+    lo = int(len(energy) * (1.0 - search_fraction))
+    if lo >= len(energy):
+        return len(window)
+    return (lo + int(np.argmin(energy[lo:]))) * frame_len or len(window)
+
+
+def zero_crossing_rate(audio: np.ndarray, sample_rate: int = SAMPLE_RATE, frame_ms: float = 30.0) -> np.ndarray:
+    """Fraction of sign changes per frame, high for hiss and unvoiced consonants."""
+    frame_len = max(1, int(sample_rate * frame_ms / 1000))
+    n_frames = len(audio) // frame_len
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.float32)
+
+    frames = audio[: n_frames * frame_len].reshape(n_frames, frame_len)
+    signs = np.signbit(frames)
+    return np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / float(frame_len)
+
+
+def estimate_noise_floor(energy: np.ndarray) -> float:
+    """Noise floor in dBFS as the 10th percentile of frame energies."""
+    return float(np.percentile(energy, 10)) if len(energy) else -100.0
+
+
+def speech_mask(
+    audio: np.ndarray,
+    sample_rate: int = SAMPLE_RATE,
+    frame_ms: float = 30.0,
+    threshold_db: float = 12.0,
+    floor_db: float = -60.0,
+    hangover_ms: float = 300.0,
+    noise_floor_db: Optional[float] = None,
+) -> np.ndarray:
+    """
+    Boolean speech/non-speech decision per frame. A frame is speech when it is
+    `threshold_db` above the noise floor, or slightly quieter but with a
+    zero-crossing rate typical of fricatives. Decisions are widened by
+    `hangover_ms` on both sides so word onsets and tails survive.
+
+    The noise floor is estimated from the input unless `noise_floor_db` is
+    given; short windows that are mostly speech need an outside estimate.
+    """
+    energy = frame_energy(audio, sample_rate, frame_ms)
+    if len(energy) == 0:
+        return np.zeros(0, dtype=bool)
+
+    zcr = zero_crossing_rate(audio, sample_rate, frame_ms)
+    if noise_floor_db is None:
+        noise_floor_db = estimate_noise_floor(energy)
+    noise_floor = max(noise_floor_db, floor_db)
+    voiced = energy > noise_floor + threshold_db
+    unvoiced = (energy > noise_floor + threshold_db / 2) & (zcr > 0.1) & (zcr < 0.5)
+    mask = voiced | unvoiced
+
+    hangover = int(hangover_ms / frame_ms)
+    if hangover > 0:
+        kernel = np.ones(2 * hangover + 1, dtype=np.int32)
+        mask = np.convolve(mask.astype(np.int32), kernel, mode="same") > 0
+    return mask
+
+
+class TimeMap:
+    """Maps timestamps in trimmed audio back to the original recording."""
+
+    def __init__(self, kept_spans, sample_rate: int = SAMPLE_RATE, original_samples: int = 0):
+        self.sample_rate = sample_rate
+        self.kept_spans = list(kept_spans)
+        lengths = np.array([end - start for start, end in self.kept_spans], dtype=np.int64)
+        self._orig_starts = np.array([start for start, _ in self.kept_spans], dtype=np.int64)
+        self._trim_starts = np.concatenate([[0], np.cumsum(lengths)[:-1]]) if len(lengths) else lengths
+        self.kept_samples = int(lengths.sum())
+        self.original_samples = original_samples or self.kept_samples
+
+    @property
+    def removed_seconds(self) -> float:
+        return (self.original_samples - self.kept_samples) / self.sample_rate
+
+    def to_original(self, seconds):
+        """Convert a time (or array of times) in trimmed audio to original audio time."""
+        if not len(self._orig_starts):
+            return seconds
+        samples = np.asarray(seconds, dtype=np.float64) * self.sample_rate
+        idx = np.clip(np.searchsorted(self._trim_starts, samples, side="right") - 1, 0, None)
+        original = self._orig_starts[idx] + (samples - self._trim_starts[idx])
+        result = original / self.sample_rate
+        return float(result) if np.ndim(result) == 0 else result
+
+    def remap_segments(self, segments):
+        remapped = []
+        for segment in segments:
+            shifted = dict(segment)
+            shifted["start"] = self.to_original(segment["start"])
+            shifted["end"] = self.to_original(segment["end"])
+            if "words" in segment:
+                shifted["words"] = [
+                    {**word, "start": self.to_original(word["start"]), "end": self.to_original(word["end"])}
+                    for word in segment["words"]
+                ]
+            remapped.append(shifted)
+        return remapped
+
+
+def trim_silence(
+    audio: np.ndarray,
+    sample_rate: int = SAMPLE_RATE,
+    min_silence_seconds: float = 1.0,
+    frame_ms: float = 30.0,
+    **mask_options,
+):
+    """
+    Drop non-speech runs longer than `min_silence_seconds`. Shorter pauses are
+    kept so phrasing is preserved. Returns (trimmed_audio, TimeMap).
+    """
+    total = len(audio)
+    frame_len = max(1, int(sample_rate * frame_ms / 1000))
+    mask = speech_mask(audio, sample_rate, frame_ms, **mask_options)
+    if len(mask) == 0:
+        return audio, TimeMap([(0, total)], sample_rate, total)
+
+    # Runs of silence as [start, end) frame indices
+    padded = np.concatenate([[1], mask.astype(np.int8), [1]])
+    edges = np.diff(padded)
+    silence_starts = np.flatnonzero(edges == -1)
+    silence_ends = np.flatnonzero(edges == 1)
+    long_runs = (silence_ends - silence_starts) * frame_ms / 1000 >= min_silence_seconds
+
+    kept = []
+    cursor = 0
+    for start, end in zip(silence_starts[long_runs] * frame_len, silence_ends[long_runs] * frame_len):
+        if start > cursor:
+            kept.append((cursor, int(start)))
+        cursor = int(end)
+    # The tail past the last full frame belongs to whatever run ends there
+    if cursor < total and not (len(silence_ends) and long_runs[-1] and silence_ends[-1] == len(mask)):
+        kept.append((cursor, total))
+
+    time_map = TimeMap(kept, sample_rate, total)
+    if not kept:
+        return np.zeros(0, dtype=audio.dtype), time_map
+    if len(kept) == 1 and kept[0] == (0, total):
+        return audio, time_map
+    return np.concatenate([audio[start:end] for start, end in kept]), time_map
@@ -1,18 +1,31 @@
 import typer
 from pathlib import Path
-import whisper
+from typing import Optional
+from retention.asr.constants import AUTO_MODEL, CANDIDATE_MODELS, DEFAULT_RTF_BUDGET
+from retention.asr.transcribe import transcribe_file
 from retention.nlp.chunk import chunk_file, chunk_text
-from retention.nlp.summarize import summarize_file
-from retention.validation import validate_file
+from retention.nlp.summarize import DEFAULT_CONCURRENCY, summarize_file
+from retention.validation import describe_media, probe_media, validate_file
 
 
-model = whisper.load_model("base")
 app = typer.Typer()
 
 
 @app.command()
 
-def run(lecture: str):
+def run(
+    lecture: str,
+    workers: Optional[int] = None,
+    cache: bool = True,
+    backend: Optional[str] = None,
+    model: str = AUTO_MODEL,
+    rtf_budget: float = DEFAULT_RTF_BUDGET,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    resume: bool = False,
+):
+
+    from retention.asr.calibrate import resolve_model
+    from retention.asr.transcript import result_segments, transcript_path, write_transcript
 
     path = Path(lecture)    
 
@@ -22,14 +35,14 @@ def run(lecture: str):
 
     
   
-    typer.echo(f"Got file: {lecture} \n Transcribing....")
-    result = model.transcribe(str(lecture))
+    model = resolve_model(model, rtf_budget, backend)
+    typer.echo(f"Got file: {lecture} ({describe_media(probe_media(path))}) \n Transcribing with '{model}'....")
+    result = transcribe_file(str(lecture), model, workers=workers, cache=cache, backend=backend)
+    typer.echo(f"Skipped {result.get('removed_seconds', 0.0):.1f}s of silence")
 
 
-    # save the raw transcription
-    transcription_path = Path("data/transcriptions") / f"{path.stem}.txt"
-    transcription_path.parent.mkdir(parents=True, exist_ok=True)
-    transcription_path.write_text(str(result["text"]), encoding="UTF-8") 
+    # save the segment transcript (timestamps and confidences, not just text)
+    transcription_path = write_transcript(transcript_path("data/transcriptions", path.stem), result_segments(result))
 
     typer.echo(f"chunking lecture {lecture} transcriptions..")
     chunk_file(str(transcription_path))
@@ -39,10 +52,60 @@ def run(lecture: str):
     
     typer.echo("Done chunking. Summarizing now...")
 
-    summarize_file(chunk_file_path)
+    summarize_file(chunk_file_path, concurrency=concurrency, cache=cache, resume=resume)
+
+
+
+
+@app.command()
+def summarize(chunks: str, concurrency: int = DEFAULT_CONCURRENCY, cache: bool = True, resume: bool = True):
+    """Summarize a chunks.json file, by default only the chunks its journal doesn't have as done."""
+    failed = summarize_file(chunks, concurrency=concurrency, cache=cache, resume=resume)
+    if failed:
+        raise typer.Exit(1)
+
 
+@app.command()
+def calibrate(
+    clip: Optional[str] = None,
+    backend: Optional[str] = None,
+    models: str = ",".join(CANDIDATE_MODELS),
+    rtf_budget: float = DEFAULT_RTF_BUDGET,
+):
+    """Measure each model's real-time factor on this machine and store it for --model auto."""
+    from retention.asr import calibrate as calibration
+
+    try:
+        result = calibration.calibrate([name.strip() for name in models.split(",") if name.strip()], clip, backend)
+    except FileNotFoundError as exc:
+        typer.echo(str(exc), err=True)
+        raise typer.Exit(1)
+    for name, rtf in result["rtf"].items():
+        typer.echo(f"{name:8s} {rtf:.3f}x real time")
+    typer.echo(f"Auto model with a {rtf_budget:.2f} budget: {calibration.select_model(rtf_budget, backend)}")
+
+
+@app.command()
+def transcription_cache(clear: bool = False):
+    from retention.asr.cache import get_cache
+
+    cache = get_cache()
+    if clear:
+        cache.clear()
+    stats = cache.stats()
+    typer.echo(f"{stats['entries']} cached transcription(s), {stats['bytes'] / 1e6:.1f} MB of {stats['max_bytes'] / 1e6:.0f} MB")
 
 
+@app.command()
+def llm_cache(clear: bool = False):
+    from retention.nlp.cache import get_cache
+
+    cache = get_cache()
+    if clear:
+        cache.clear()
+    stats = cache.stats()
+    typer.echo(f"{stats['entries']} cached LLM response(s), {stats['bytes'] / 1e6:.1f} MB of {stats['max_bytes'] / 1e6:.0f} MB")
+
 
 if __name__ == "__main__":
     app()
\ No newline at end of file
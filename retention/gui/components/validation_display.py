@@ -3,7 +3,7 @@ from PySide6.QtWidgets import QWidget, QVBoxLayout, QLabel, QHBoxLayout, QPushBu
 from PySide6.QtCore import Qt, Signal
 from pathlib import Path
 
-from ...validation import validate_api_key, validate_file_type, validate_file_size
+from ...validation import media_problem, validate_api_key, validate_file_type
 from ..utils.styles import validation_display_styles
 
 
@@ -107,9 +107,10 @@ class ValidationDisplay(QWidget):
             self.validate_btn.setEnabled(True)
             return False
 
-        if not validate_file_size(file_path):
+        problem = media_problem(file_path)
+        if problem:
             self._set_indicator(self.file_indicator, "error")
-            message = "Invalid file size. Must be between 1MB and 1GB."
+            message = f"{problem}."
             self.file_status.setText(message)
             self.file_status.setStyleSheet("color: #dc2626;")
             self.validation_failed.emit(message)
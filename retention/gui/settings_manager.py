@@ -50,17 +50,26 @@ class SettingsManager:
         return {
             "api_key": "",
             "flashcards": {"enabled": True, "mode": "quick"},
+            "transcription": {"live": True, "backend": "whisper", "model": "auto", "rtf_budget": 0.5},
+            "recording": {
+                "capture_mode": "speech",
+                "stream_to_disk": True,
+                "segment_minutes": 0,
+                "format": "flac",
+                "transcode_wav": True,
+            },
         }
 
     def _merge_with_defaults(self, settings):
         defaults = self._get_default_settings()
-        defaults.update(settings or {})
+        merged = {**defaults, **(settings or {})}
 
-        if "flashcards" not in defaults:
-            defaults["flashcards"] = {}
-        defaults["flashcards"] = {
-            **self._get_default_settings()["flashcards"],
-            **defaults["flashcards"],
-        }
+        # Nested sections are merged key by key so new options get their defaults
+        for section, section_defaults in defaults.items():
+            if isinstance(section_defaults, dict):
+                merged[section] = {
+                    **section_defaults,
+                    **(merged.get(section) or {}),
+                }
 
-        return defaults
+        return merged
@@ -11,25 +11,36 @@ from PySide6.QtWidgets import (
     QGraphicsDropShadowEffect,
     QStyle,
 )
-from PySide6.QtCore import Qt, Signal, QPoint, QSize
+from PySide6.QtCore import Qt, Signal, QPoint, QSize, QThreadPool, QTimer
 from PySide6.QtGui import QMouseEvent, QShortcut, QKeySequence, QCursor, QColor
+import threading
 from pathlib import Path
 from datetime import datetime
-import whisper
 
 from .settings import SettingsDialog
-from ...recording.SysAudio import AudioRecorder
-from ...nlp.chunk import chunk_file
-from ...nlp.summarize import summarize_file
-from ...nlp.flashcards import deep_flashcard, quick_flashcard
+from ...asr.constants import AUTO_MODEL, DEFAULT_RTF_BUDGET
+from ...asr.streaming import StreamingTranscriber
+from ...asr.transcribe import DEFAULT_BACKEND, DEFAULT_MODEL, prewarm_transcriber, set_default_backend
+from ...recording.formats import FORMAT_FLAC, FORMAT_WAV
+from ...recording.SysAudio import CAPTURE_SPEECH, AudioRecorder
+from ...recording.telemetry import summarize_metrics, write_metrics
+from ...recording.writer import interrupted_markers
 from ..components.validation_display import ValidationDisplay
+from ..workers import PipelineWorker, RecoveryWorker, SegmentPipeline, TranscodeWorker
 from ..utils.styles import main_window_styles
 
+MIN_RECORDING_SECONDS = 5
+# How long closing the window waits for a cancelled pipeline to stop
+CLOSE_WAIT_MS = 5000
+
 
 class MainWindow(QWidget):
     record_requested = Signal()
     stop_requested = Signal()
     settings_changed = Signal(dict)
+    live_segment = Signal(dict)
+    segment_processed = Signal(int)
+    transcription_model_ready = Signal(str)
 
     def __init__(self, api_key):
         super().__init__()
@@ -37,9 +48,34 @@ class MainWindow(QWidget):
         self.is_recording = False
         self.is_processing = False
         self.flashcard_settings = {"enabled": True, "mode": "quick"}
+        self.transcription_settings = {
+            "live": True,
+            "backend": DEFAULT_BACKEND,
+            "model": AUTO_MODEL,
+            "rtf_budget": DEFAULT_RTF_BUDGET,
+        }
+        # Replaced by the calibrated pick once _prepare_transcriber() has run
+        self.transcription_model = DEFAULT_MODEL
+        self.recording_settings = {
+            "capture_mode": CAPTURE_SPEECH,
+            "stream_to_disk": True,
+            "segment_minutes": 0,
+            "format": FORMAT_FLAC,
+            "transcode_wav": True,
+        }
+        self.settings = {}
         self.current_audio_file = None
-
-        self.audio_recorder = AudioRecorder()
+        self.live_transcriber = None
+        self.segment_pipeline = None
+        self._live_segment_count = 0
+        self._recording_timestamp = None
+        self.pipeline_worker = None
+        self.transcode_worker = None
+        self.recovery_worker = None
+        self.thread_pool = QThreadPool.globalInstance()
+        self._model_prewarmed = False
+
+        self.audio_recorder = AudioRecorder(capture_mode=CAPTURE_SPEECH)
         self.data_dir = Path("data")
         self.data_dir.mkdir(exist_ok=True)
 
@@ -53,6 +89,15 @@ class MainWindow(QWidget):
 
         self._setup_ui()
         self._check_initial_state()
+        self._recover_interrupted_recordings()
+        # Polls recorder telemetry while capturing so glitches show up in the status
+        self._telemetry_timer = QTimer(self)
+        self._telemetry_timer.setInterval(2000)
+        self._telemetry_timer.timeout.connect(self._on_telemetry_tick)
+        # Emitted from the live transcriber thread, delivered on the UI thread
+        self.live_segment.connect(self._on_live_segment)
+        self.segment_processed.connect(self._on_segment_processed)
+        self.transcription_model_ready.connect(self._on_transcription_model_ready)
 
     def _setup_ui(self):
         self.setFixedWidth(320)
@@ -309,6 +354,9 @@ class MainWindow(QWidget):
             self._on_record_clicked()
 
     def _on_record_clicked(self):
+        if self.is_processing:
+            return
+
         if not self._is_api_key_valid():
             self._set_status(
                 "Add your OpenAI API key to get started.",
@@ -338,6 +386,10 @@ class MainWindow(QWidget):
         self.record_requested.emit()
 
     def _on_stop_clicked(self):
+        if self.is_processing and self.pipeline_worker is not None:
+            self._cancel_pipeline()
+            return
+
         if not self.is_recording:
             return
 
@@ -357,7 +409,9 @@ class MainWindow(QWidget):
         dialog.set_settings({"api_key": self.api_key, "flashcards": self.flashcard_settings})
 
         if dialog.exec():
-            settings = dialog.get_settings()
+            # Keep sections the dialog doesn't edit so saving doesn't reset them
+            settings = {**self.settings, **dialog.get_settings()}
+            self.settings = settings
             self.api_key = settings["api_key"]
             self.flashcard_settings = settings["flashcards"]
             self.settings_changed.emit(settings)
@@ -378,13 +432,93 @@ class MainWindow(QWidget):
     def load_settings(self, settings):
         from ...validation import sanitize_api_key
 
+        self.settings = dict(settings)
         self.api_key = sanitize_api_key(settings.get("api_key", ""))
         self.flashcard_settings = settings.get("flashcards", {"enabled": True, "mode": "quick"})
+        self.transcription_settings = {**self.transcription_settings, **settings.get("transcription", {})}
+        try:
+            set_default_backend(self.transcription_settings["backend"])
+        except ValueError as exc:
+            print(f"{exc}; using {DEFAULT_BACKEND}")
+            set_default_backend(DEFAULT_BACKEND)
+        model = self.transcription_settings.get("model") or AUTO_MODEL
+        if model != AUTO_MODEL:
+            self.transcription_model = model
+        self.recording_settings = {**self.recording_settings, **settings.get("recording", {})}
+        self.audio_recorder.capture_mode = self.recording_settings.get("capture_mode", CAPTURE_SPEECH)
+        self.audio_recorder.file_format = self.recording_settings.get("format", FORMAT_FLAC)
+
+    def _stop_transcoding(self):
+        if self.transcode_worker is not None:
+            self.transcode_worker.stop()
 
     def _on_close_clicked(self):
+        self._shutdown_workers()
         QApplication.quit()
 
+    def _shutdown_workers(self):
+        self._stop_transcoding()
+        self._cancel_pipeline()
+        # Qt joins the global pool on exit; give a cancelled job a bounded time to stop its requests
+        if not self.thread_pool.waitForDone(CLOSE_WAIT_MS):
+            print("Background work is still stopping")
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self._model_prewarmed:
+            self._model_prewarmed = True
+            # Let the first frame paint before the loader thread competes for the CPU
+            QTimer.singleShot(0, self._prepare_transcriber)
+            self._start_transcoding()
+
+    def _prepare_transcriber(self):
+        """Pick the model size (calibrating in auto mode when new weights are on disk) and prewarm it, off the UI thread."""
+        settings = dict(self.transcription_settings)
+        model = self.transcription_model
+        in_process = self._segmented_recording() or settings.get("live", True)
+
+        def _run():
+            from ...asr import calibrate
+
+            name = model
+            try:
+                if (settings.get("model") or AUTO_MODEL) == AUTO_MODEL:
+                    # Only models already on disk, so launching doesn't download gigabytes
+                    candidates = calibrate.downloaded_models()
+                    if calibrate.needs_calibration(candidates):
+                        calibrate.calibrate(candidates)
+                    name = calibrate.resolve_model(AUTO_MODEL, settings.get("rtf_budget"))
+                    print(f"Using Whisper model '{name}'")
+                    # A pipeline may be reading transcription_model; the UI thread sets it
+                    self.transcription_model_ready.emit(name)
+            except Exception as exc:
+                print(f"Model calibration failed: {exc}")
+            # Live and segment transcription use the in-process model; only a full-file pass uses the worker pool
+            prewarm_transcriber(name, workers=1 if in_process else None)
+
+        threading.Thread(target=_run, name="asr-calibration", daemon=True).start()
+
+    def _on_transcription_model_ready(self, name):
+        # The user may have picked a fixed model while calibration ran
+        if (self.transcription_settings.get("model") or AUTO_MODEL) == AUTO_MODEL:
+            self.transcription_model = name
+
+    def _start_transcoding(self):
+        file_format = self.recording_settings.get("format", FORMAT_FLAC)
+        if file_format == FORMAT_WAV or not self.recording_settings.get("transcode_wav", True):
+            return
+        worker = TranscodeWorker(self.data_dir, file_format)
+        worker.signals.finished.connect(self._on_transcoding_finished)
+        self.transcode_worker = worker
+        self.thread_pool.start(worker)
+
+    def _on_transcoding_finished(self, paths):
+        self.transcode_worker = None
+        if paths:
+            print(f"Compressed {len(paths)} old recording(s)")
+
     def closeEvent(self, event):
+        self._shutdown_workers()
         QApplication.quit()
         event.accept()
 
@@ -398,20 +532,122 @@ class MainWindow(QWidget):
             self.move(event.globalPosition().toPoint() - self._drag_position)
             event.accept()
 
+    def _segmented_recording(self) -> bool:
+        return bool(self.recording_settings.get("stream_to_disk", True)) and float(
+            self.recording_settings.get("segment_minutes") or 0
+        ) > 0
+
     def start_recording(self):
+        self._live_segment_count = 0
+        self._recording_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        stream_to_disk = self.recording_settings.get("stream_to_disk", True)
+        segment_seconds = None
+        if self._segmented_recording():
+            # Long sessions roll over to new files; each one is transcribed and
+            # summarized while capture goes on, which replaces live transcription
+            segment_seconds = float(self.recording_settings["segment_minutes"]) * 60
+            self.segment_pipeline = SegmentPipeline(
+                self.api_key, model=self.transcription_model, on_done=self.segment_processed.emit
+            )
+        elif self.transcription_settings.get("live", True):
+            self.live_transcriber = StreamingTranscriber(
+                self.audio_recorder.sample_rate,
+                name=self.transcription_model,
+                on_segment=self.live_segment.emit,
+            )
+        self.audio_recorder.live_transcriber = self.live_transcriber
+
+        output_path = None
+        if stream_to_disk:
+            # Written as it is captured: constant memory and nothing lost on a crash
+            output_path = self.data_dir / f"recording_{self._recording_timestamp}{self.audio_recorder.file_suffix}"
+
         try:
-            self.audio_recorder.start_recording()
+            self.audio_recorder.start_recording(
+                output_path,
+                segment_seconds=segment_seconds,
+                on_segment=self.segment_pipeline.submit if self.segment_pipeline is not None else None,
+            )
+            self._telemetry_timer.start()
         except Exception as exc:
             print(f"Recording error: {exc}")
+            self._discard_live_transcriber()
+            self._discard_segment_pipeline()
             self.is_recording = False
             self.record_btn.setEnabled(True)
             self.stop_btn.setEnabled(False)
             self._set_status("Recording failed to start", state="error", detail=str(exc))
 
+    def _recover_interrupted_recordings(self):
+        # Markers are listed now, before any new recording can add its own
+        markers = interrupted_markers(self.data_dir)
+        if not markers:
+            return
+        worker = RecoveryWorker(self.data_dir, markers)
+        worker.signals.finished.connect(self._on_recovery_finished)
+        self.recovery_worker = worker
+        self.thread_pool.start(worker)
+
+    def _on_recovery_finished(self, paths):
+        self.recovery_worker = None
+        if paths:
+            names = ", ".join(Path(path).name for path in paths)
+            print(f"Recovered interrupted recordings: {names}")
+            self._show_helper_message(f"Recovered interrupted recording(s): {names}")
+
+    def _discard_live_transcriber(self):
+        if self.live_transcriber is not None:
+            self.live_transcriber.cancel()
+        self.live_transcriber = None
+        self.audio_recorder.live_transcriber = None
+
+    def _discard_segment_pipeline(self):
+        if self.segment_pipeline is not None:
+            self.segment_pipeline.cancel()
+        self.segment_pipeline = None
+
+    def _on_segment_processed(self, index):
+        if self.is_recording:
+            self.status_detail.setText(f"Segment {index + 1} transcribed and summarized")
+
+    def _on_telemetry_tick(self):
+        if not self.is_recording:
+            self._telemetry_timer.stop()
+            return
+        problems = summarize_metrics(self.audio_recorder.metrics())
+        if problems:
+            self._set_status("Recording", state="recording", detail=problems)
+
+    def _write_session_metrics(self, timestamp):
+        try:
+            metrics = self.audio_recorder.metrics()
+            path = write_metrics(self.data_dir / "metrics" / f"recording_{timestamp}_metrics.json", metrics)
+        except Exception as exc:
+            print(f"Could not write recording metrics: {exc}")
+            return
+        print(f"Recording metrics saved: {path}")
+        problems = summarize_metrics(metrics)
+        if problems:
+            print(problems)
+
+    def _on_live_segment(self, segment):
+        self._live_segment_count += 1
+        if self.is_recording:
+            text = str(segment.get("text", "")).strip()
+            self.status_detail.setText(f"Live transcript ({self._live_segment_count}): {text[-80:]}")
+
     def stop_recording(self):
+        # The pipeline worker takes over the live transcriber; the recorder lets go of it
+        live_transcriber = self.live_transcriber
+        self.live_transcriber = None
+        segment_pipeline = self.segment_pipeline
+        self.segment_pipeline = None
+        self._telemetry_timer.stop()
         try:
-            audio, sample_rate = self.audio_recorder.stop_recording()
-            if audio is None:
+            self.audio_recorder.stop_recording()
+            timestamp = self._recording_timestamp or datetime.now().strftime("%Y%m%d_%H%M%S")
+            self._write_session_metrics(timestamp)
+            if not self.audio_recorder.frames_recorded:
                 self._set_status(
                     "No audio captured",
                     state="warning",
@@ -419,22 +655,31 @@ class MainWindow(QWidget):
                 )
                 return
 
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_path = self.data_dir / f"recording_{timestamp}.wav"
-            self.audio_recorder.save_recording(str(output_path))
-            print(f"Recording saved: {output_path}")
-            self._show_helper_message(f"Recording saved: {output_path.name}")
+            output_path = self.data_dir / f"recording_{timestamp}{self.audio_recorder.file_suffix}"
+            segment_paths = self.audio_recorder.segment_paths
+            if segment_paths:
+                # Validate the first segment; the rest share its format
+                output_path = segment_paths[0]
+                print(f"Recording saved in {len(segment_paths)} segment(s)")
+                self._show_helper_message(f"Recording saved: {len(segment_paths)} segment(s)")
+            else:
+                self.audio_recorder.save_recording(str(output_path))
+                print(f"Recording saved: {output_path}")
+                self._show_helper_message(f"Recording saved: {output_path.name}")
 
-            file_size = output_path.stat().st_size
-            if file_size < 1024 * 1024:
+            duration = self.audio_recorder.duration
+            if duration < MIN_RECORDING_SECONDS:
                 self._set_status(
                     "Recording too short",
                     state="warning",
-                    detail="Capture at least 1MB of audio for accurate transcription.",
+                    detail=f"Capture at least {MIN_RECORDING_SECONDS} seconds of audio for accurate transcription.",
                 )
                 msg_box = QMessageBox(self)
                 msg_box.setWindowTitle("Recording Too Short")
-                msg_box.setText("Recording is too short (less than 1MB). Please record for a longer duration.")
+                msg_box.setText(
+                    f"Recording is too short (less than {MIN_RECORDING_SECONDS} seconds). "
+                    "Please record for a longer duration."
+                )
                 msg_box.setIcon(QMessageBox.Icon.Warning)
                 msg_box.setStandardButtons(QMessageBox.StandardButton.Ok)
                 msg_box.setDefaultButton(QMessageBox.StandardButton.Ok)
@@ -455,7 +700,9 @@ class MainWindow(QWidget):
                     state="processing",
                     detail="Transcribing, summarizing, and generating materials...",
                 )
-                self._run_pipeline(str(output_path), timestamp)
+                self._start_pipeline(str(output_path), timestamp, live_transcriber, segment_pipeline)
+                live_transcriber = None
+                segment_pipeline = None
             else:
                 self.is_processing = False
                 self._set_status(
@@ -468,6 +715,13 @@ class MainWindow(QWidget):
             self.is_processing = False
             print(f"Stop recording error: {exc}")
             self._set_status("Stop recording failed", state="error", detail=str(exc))
+        finally:
+            self.audio_recorder.live_transcriber = None
+            # Not handed to a worker: stop it instead of transcribing the leftovers
+            if live_transcriber is not None:
+                live_transcriber.cancel()
+            if segment_pipeline is not None:
+                segment_pipeline.cancel()
 
     def _cleanup_intermediate_files(self, *paths: Path) -> None:
         for path in paths:
@@ -479,75 +733,121 @@ class MainWindow(QWidget):
             except Exception as exc:
                 print(f"Cleanup warning for {path}: {exc}")
 
-    def _run_pipeline(self, audio_path, timestamp):
-        flashcard_path = None
-        transcription_path = None
-        chunk_file_path = None
-        try:
-            print("Starting pipeline...")
-
-            model = whisper.load_model("base")
-
-            print("Transcribing...")
-            result = model.transcribe(audio_path)
+    def _start_pipeline(self, audio_path, timestamp, live_transcriber=None, segment_pipeline=None):
+        print("Starting pipeline...")
+        worker = PipelineWorker(
+            audio_path,
+            timestamp,
+            data_dir=self.data_dir,
+            api_key=self.api_key,
+            flashcard_settings=self.flashcard_settings,
+            model=self.transcription_model,
+            live_transcriber=live_transcriber,
+            segment_pipeline=segment_pipeline,
+        )
+        worker.signals.stage_started.connect(self._on_pipeline_stage)
+        worker.signals.progress.connect(self._on_pipeline_progress)
+        worker.signals.partial_result.connect(self._on_pipeline_partial_result)
+        worker.signals.finished.connect(self._on_pipeline_finished)
+        worker.signals.failed.connect(self._on_pipeline_failed)
+        worker.signals.cancelled.connect(self._on_pipeline_cancelled)
+
+        self.pipeline_worker = worker
+        self.record_btn.setEnabled(False)
+        self.stop_btn.setText("Cancel")
+        self.stop_btn.setToolTip("Cancel processing")
+        self.stop_btn.setEnabled(True)
+        self.thread_pool.start(worker)
 
-            transcription_path = self.data_dir / "transcriptions" / f"recording_{timestamp}.txt"
-            transcription_path.parent.mkdir(parents=True, exist_ok=True)
-            transcription_path.write_text(result["text"], encoding="UTF-8")  # type: ignore
-            print(f"Transcription saved: {transcription_path}")
+    def _cancel_pipeline(self):
+        if self.pipeline_worker is None or self.pipeline_worker.is_cancelled():
+            return
+        self.pipeline_worker.cancel()
+        self.stop_btn.setEnabled(False)
+        self._set_status(
+            "Cancelling",
+            state="processing",
+            detail="Stopping transcription and summary requests...",
+        )
 
-            print("Chunking...")
-            chunk_file(str(transcription_path))
-            chunk_file_path = self.data_dir / "chunks" / f"recording_{timestamp}_chunks.json"
-            print(f"Chunks saved: {chunk_file_path}")
+    def _finish_pipeline(self):
+        self.is_processing = False
+        self.pipeline_worker = None
+        self.stop_btn.setText("Process")
+        self.stop_btn.setToolTip("Stop and process (Space)")
+        self.stop_btn.setEnabled(False)
+        self._check_initial_state()
 
-            print("Summarizing...")
-            summarize_file(str(chunk_file_path), api_key=self.api_key)
-            summaries_path = self.data_dir / "summaries" / f"recording_{timestamp}_summaries.json"
-            print(f"Summaries saved: {summaries_path}")
+    def _on_pipeline_stage(self, stage, message):
+        self._set_status("Processing", state="processing", detail=message)
 
-            if self.flashcard_settings.get("enabled", False):
-                print("Generating flashcards...")
-                flashcard_mode = self.flashcard_settings.get("mode", "quick")
+    def _on_pipeline_progress(self, stage, percent):
+        if self.pipeline_worker is not None and not self.pipeline_worker.is_cancelled():
+            self.status_label.setText(f"Processing ({percent}%)")
 
-                if flashcard_mode == "deep":
-                    deep_flashcard(str(chunk_file_path), api_key=self.api_key)
-                    flashcard_path = self.data_dir / "flashcards" / f"recording_{timestamp}_chunks_flashcards.md"
-                else:
-                    quick_flashcard(str(summaries_path), api_key=self.api_key)
-                    flashcard_path = self.data_dir / "flashcards" / f"recording_{timestamp}_summaries_flashcards.md"
+    def _on_pipeline_partial_result(self, stage, path):
+        if stage in ("summarize", "flashcards"):
+            self.output_label.setText(f"Saved so far: {Path(path).name}")
+            self.output_label.setVisible(True)
+            self.adjustSize()
 
-                print(f"Flashcards saved: {flashcard_path}")
+    def _on_pipeline_finished(self, result):
+        self._finish_pipeline()
 
-            print("Pipeline completed successfully!")
+        self.validation_display.setVisible(False)
+        self.adjustSize()
 
-            self.validation_display.setVisible(False)
-            self.adjustSize()
+        outputs = [result["summaries_path"].name]
+        if result["flashcard_path"] is not None:
+            outputs.append(result["flashcard_path"].name)
 
-            outputs = [summaries_path.name]
-            if flashcard_path is not None:
-                outputs.append(flashcard_path.name)
+        self.output_label.setText("Saved files: " + ", ".join(outputs))
+        self.output_label.setVisible(True)
 
-            self._show_helper_message("Capture again when you are ready.")
-            self.output_label.setText("Saved files: " + ", ".join(outputs))
-            self.output_label.setVisible(True)
+        failed = result.get("failed_chunks") or []
+        if failed:
+            # Keep the chunks and journal so `summarize-file --resume` can retry just these
+            chunk_file = result["chunk_file_path"]
+            self._show_helper_message(f"Retry them with: python -m retention.cli summarize {chunk_file}")
             self._set_status(
-                "Complete",
-                state="success",
-                detail="Outputs are ready in the data folder.",
+                "Partly summarized",
+                state="warning",
+                detail=f"{len(failed)} chunk(s) could not be summarized and are missing from the summary.",
             )
+            self._cleanup_intermediate_files(result["transcription_path"], result["transcription_index_path"])
+            return
 
-            self._cleanup_intermediate_files(transcription_path, chunk_file_path)
-        except Exception as exc:
-            print(f"Pipeline error: {exc}")
-            self._set_status(
-                "Processing failed",
-                state="error",
-                detail="See the error details dialog for more information.",
-            )
-            self._show_pipeline_error(str(exc))
-        finally:
-            self.is_processing = False
+        self._show_helper_message("Capture again when you are ready.")
+        self._set_status(
+            "Complete",
+            state="success",
+            detail="Outputs are ready in the data folder.",
+        )
+
+        self._cleanup_intermediate_files(
+            result["transcription_path"],
+            result["transcription_index_path"],
+            result["chunk_file_path"],
+            result["summary_journal_path"],
+        )
+
+    def _on_pipeline_failed(self, error_msg):
+        self._finish_pipeline()
+        self._set_status(
+            "Processing failed",
+            state="error",
+            detail="See the error details dialog for more information.",
+        )
+        self._show_pipeline_error(error_msg)
+
+    def _on_pipeline_cancelled(self):
+        self._finish_pipeline()
+        self._show_helper_message("Processing cancelled. The recording is kept in the data folder.")
+        self._set_status(
+            "Cancelled",
+            state="warning",
+            detail="Capture again when you are ready.",
+        )
 
     def get_api_key(self):
         return self.api_key
@@ -594,7 +894,7 @@ class MainWindow(QWidget):
                     detail="Open Settings and paste your key before recording.",
                 )
         else:
-            self.record_btn.setEnabled(True)
+            self.record_btn.setEnabled(not self.is_processing)
             self.record_btn.setToolTip("Start recording (Space)")
 
         self._update_api_badge()
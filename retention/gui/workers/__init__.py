@@ -0,0 +1,17 @@
+# GUI background workers module
+from .pipeline_worker import PipelineCancelled, PipelineSignals, PipelineWorker
+from .recovery_worker import RecoverySignals, RecoveryWorker
+from .segment_pipeline import SegmentPipeline, merge_segment_results
+from .transcode_worker import TranscodeSignals, TranscodeWorker
+
+__all__ = [
+    "PipelineCancelled",
+    "PipelineSignals",
+    "PipelineWorker",
+    "RecoverySignals",
+    "RecoveryWorker",
+    "SegmentPipeline",
+    "merge_segment_results",
+    "TranscodeSignals",
+    "TranscodeWorker",
+]
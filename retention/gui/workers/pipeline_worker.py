@@ -0,0 +1,195 @@
+import json
+import threading
+from concurrent.futures import CancelledError
+from pathlib import Path
+
+from PySide6.QtCore import QObject, QRunnable, Signal
+
+from ...asr.transcribe import DEFAULT_MODEL, transcribe_file
+from ...asr.transcript import index_path, result_segments, transcript_path, write_transcript
+from ...nlp.chunk import chunk_file
+from ...nlp.summarize import master_summary, summarize_file, write_summaries
+from ...nlp.flashcards import deep_flashcard, quick_flashcard
+from ...nlp.journal import journal_path
+from ...validation import describe_media, probe_media
+from .segment_pipeline import merge_segment_results
+
+
+# The live transcriber is at most a couple of minutes behind; past this, transcribing the file is faster
+LIVE_FINISH_TIMEOUT = 300.0
+
+
+class PipelineCancelled(Exception):
+    """Raised inside the worker when the user cancels a running job."""
+
+
+class PipelineSignals(QObject):
+    # Qt signals must live on a QObject, QRunnable can't own them
+    stage_started = Signal(str, str)
+    progress = Signal(str, int)
+    partial_result = Signal(str, str)
+    finished = Signal(dict)
+    failed = Signal(str)
+    cancelled = Signal()
+
+
+class PipelineWorker(QRunnable):
+    """Runs transcription, chunking, summaries and flashcards off the UI thread."""
+
+    STAGES = ("transcribe", "chunk", "summarize", "flashcards")
+
+    def __init__(
+        self,
+        audio_path,
+        timestamp,
+        data_dir: Path,
+        api_key,
+        flashcard_settings,
+        model: str = DEFAULT_MODEL,
+        live_transcriber=None,
+        segment_pipeline=None,
+    ):
+        super().__init__()
+        self.audio_path = str(audio_path)
+        self.timestamp = timestamp
+        self.data_dir = Path(data_dir)
+        self.api_key = api_key
+        self.flashcard_settings = dict(flashcard_settings or {})
+        self.model = model
+        self.live_transcriber = live_transcriber
+        # Set for segmented recordings; most segments are already done
+        self.segment_pipeline = segment_pipeline
+        self.signals = PipelineSignals()
+        self._cancel_event = threading.Event()
+        # The window owns the worker lifetime, not the pool
+        self.setAutoDelete(False)
+
+    def cancel(self):
+        # Transcription and summaries poll is_cancelled() and stop mid-stage; other stages finish first
+        self._cancel_event.set()
+        if self.live_transcriber is not None:
+            self.live_transcriber.cancel()
+        if self.segment_pipeline is not None:
+            self.segment_pipeline.cancel()
+
+    def is_cancelled(self):
+        return self._cancel_event.is_set()
+
+    def _check_cancelled(self):
+        if self._cancel_event.is_set():
+            raise PipelineCancelled()
+
+    def _begin_stage(self, stage, message):
+        self._check_cancelled()
+        print(message)
+        self.signals.stage_started.emit(stage, message)
+        done = self.STAGES.index(stage)
+        self.signals.progress.emit(stage, int(done * 100 / len(self.STAGES)))
+
+    def run(self):
+        try:
+            result = self._run_pipeline()
+        except (PipelineCancelled, CancelledError):
+            print("Pipeline cancelled")
+            self.signals.cancelled.emit()
+        except Exception as exc:
+            print(f"Pipeline error: {exc}")
+            self.signals.failed.emit(str(exc))
+        else:
+            print("Pipeline completed successfully!")
+            self.signals.finished.emit(result)
+        finally:
+            # No-op after finish(); stops the thread if we bailed out before it
+            if self.live_transcriber is not None:
+                self.live_transcriber.cancel()
+            if self.segment_pipeline is not None:
+                self.segment_pipeline.cancel()
+
+    def _transcribe(self):
+        if self.live_transcriber is not None:
+            # Most of the recording was transcribed while it was captured
+            try:
+                return self.live_transcriber.finish(LIVE_FINISH_TIMEOUT)
+            except CancelledError:
+                raise
+            except Exception as exc:
+                # Stop the live thread so it doesn't compete with the full pass
+                self.live_transcriber.cancel()
+                print(f"{exc}; falling back to full transcription")
+        return transcribe_file(self.audio_path, self.model, cancelled=self.is_cancelled)
+
+    def _run_pipeline(self):
+        timestamp = self.timestamp
+        flashcard_path = None
+        merged = None
+
+        if self.segment_pipeline is not None:
+            self._begin_stage("transcribe", "Finishing the last recording segment...")
+            merged = merge_segment_results(self.segment_pipeline.results(self.is_cancelled))
+            result = merged
+        else:
+            # Header probe: fails fast on unreadable files, before any model loads
+            info = probe_media(self.audio_path)
+            self._begin_stage("transcribe", f"Transcribing {describe_media(info)}...")
+            result = self._transcribe()
+
+        print(f"Skipped {result.get('removed_seconds', 0.0):.1f}s of silence")
+
+        transcription_path = transcript_path(self.data_dir / "transcriptions", f"recording_{timestamp}")
+        write_transcript(transcription_path, result_segments(result))
+        print(f"Transcription saved: {transcription_path}")
+        self.signals.partial_result.emit("transcribe", str(transcription_path))
+
+        self._begin_stage("chunk", "Chunking...")
+        chunk_file_path = self.data_dir / "chunks" / f"recording_{timestamp}_chunks.json"
+        if merged is not None:
+            # Segments were chunked as they finished
+            chunk_file_path.parent.mkdir(parents=True, exist_ok=True)
+            chunk_file_path.write_text(json.dumps(merged["chunks"], ensure_ascii=False, indent=2), encoding="UTF-8")
+        else:
+            chunk_file(str(transcription_path))
+        print(f"Chunks saved: {chunk_file_path}")
+        self.signals.partial_result.emit("chunk", str(chunk_file_path))
+
+        summaries_path = self.data_dir / "summaries" / f"recording_{timestamp}_summaries.json"
+        failed_chunks = []
+        if merged is not None:
+            # Chunk summaries are done; only the session-wide master summary is left
+            self._begin_stage("summarize", "Merging segment summaries...")
+            summary_md_path = self.data_dir / "summaries" / f"recording_{timestamp}_summary.md"
+            summary_md_path.parent.mkdir(parents=True, exist_ok=True)
+            write_summaries(merged["summaries"], summary_md_path, summaries_path)
+            master_summary(merged["summaries"], str(summary_md_path), api_key=self.api_key, cancelled=self.is_cancelled)
+        else:
+            self._begin_stage("summarize", "Summarizing...")
+            failed_chunks = summarize_file(str(chunk_file_path), api_key=self.api_key, cancelled=self.is_cancelled)
+        print(f"Summaries saved: {summaries_path}")
+        self.signals.partial_result.emit("summarize", str(summaries_path))
+
+        if self.flashcard_settings.get("enabled", False):
+            self._begin_stage("flashcards", "Generating flashcards...")
+            flashcard_mode = self.flashcard_settings.get("mode", "quick")
+
+            if flashcard_mode == "deep":
+                deep_flashcard(str(chunk_file_path), api_key=self.api_key)
+                flashcard_path = self.data_dir / "flashcards" / f"recording_{timestamp}_chunks_flashcards.md"
+            else:
+                quick_flashcard(str(summaries_path), api_key=self.api_key)
+                flashcard_path = self.data_dir / "flashcards" / f"recording_{timestamp}_summaries_flashcards.md"
+
+            print(f"Flashcards saved: {flashcard_path}")
+            self.signals.partial_result.emit("flashcards", str(flashcard_path))
+
+        self.signals.progress.emit("done", 100)
+
+        return {
+            "transcription_path": transcription_path,
+            "transcription_index_path": index_path(transcription_path),
+            "chunk_file_path": chunk_file_path,
+            # Kept when the run fails, so `summarize-file --resume` can finish it
+            "summary_journal_path": journal_path(self.data_dir / "summaries", f"recording_{timestamp}"),
+            "summaries_path": summaries_path,
+            "flashcard_path": flashcard_path,
+            # Chunk ids left out of the summaries; their chunks and journal must be kept to retry them
+            "failed_chunks": failed_chunks,
+        }
@@ -0,0 +1,28 @@
+from pathlib import Path
+
+from PySide6.QtCore import QObject, QRunnable, Signal
+
+from ...recording.writer import recover_recordings
+
+
+class RecoverySignals(QObject):
+    finished = Signal(list)
+
+
+class RecoveryWorker(QRunnable):
+    """Repairs recordings interrupted by a crash; re-encoding hours of FLAC mustn't delay the window."""
+
+    def __init__(self, data_dir: Path, markers: list):
+        super().__init__()
+        self.data_dir = Path(data_dir)
+        self.markers = list(markers)
+        self.signals = RecoverySignals()
+        self.setAutoDelete(False)
+
+    def run(self):
+        try:
+            recovered = recover_recordings(self.data_dir, self.markers)
+        except Exception as exc:
+            print(f"Recording recovery failed: {exc}")
+            recovered = []
+        self.signals.finished.emit([str(path) for path in recovered])
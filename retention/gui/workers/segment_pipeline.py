@@ -0,0 +1,122 @@
+import threading
+from concurrent.futures import CancelledError, ThreadPoolExecutor, TimeoutError
+from pathlib import Path
+from typing import Callable, Optional
+
+from ...asr.transcribe import CANCEL_POLL_SECONDS, DEFAULT_MODEL, transcribe_file
+from ...asr.transcript import result_segments
+from ...nlp.chunk import chunk_segments
+from ...nlp.summarize import summarize_chunks_concurrently
+
+
+class SegmentPipeline:
+    """
+    Transcribes and summarizes finished recording segments one at a time
+    while capture continues. submit() is called by the recorder for every
+    segment it closes; results() waits for the remaining work and returns
+    the per-segment results in recording order.
+    """
+
+    def __init__(self, api_key, model: str = DEFAULT_MODEL, on_done: Optional[Callable[[int], None]] = None):
+        self.api_key = api_key
+        self.model = model
+        self.on_done = on_done
+        # One at a time, so segments finish in order
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="segment-pipeline")
+        self._jobs = []
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+
+    def submit(self, path, index: int, start_seconds: float):
+        if self._cancelled.is_set():
+            return
+        job = (Path(path), index, start_seconds)
+        with self._lock:
+            future = self._executor.submit(self._process, *job)
+            self._jobs.append((job, future))
+
+    def _process(self, path: Path, index: int, start_seconds: float) -> dict:
+        if self._cancelled.is_set():
+            raise CancelledError()
+        print(f"Processing segment {index + 1}: {path.name}")
+        # In-process model, not the cpu_count()-sized process pool: capture is still running
+        result = transcribe_file(str(path), self.model, workers=1, cancelled=self._cancelled.is_set)
+        text = str(result.get("text", "")).strip()
+        # Session-relative timestamps, so merged chunks point into the whole recording
+        segments = [
+            {**segment, "start": segment["start"] + start_seconds, "end": segment["end"] + start_seconds}
+            for segment in result_segments(result)
+        ]
+
+        chunks = chunk_segments(segments) if text else []
+        summaries = []
+        if chunks and not self._cancelled.is_set():
+            summaries = summarize_chunks_concurrently(chunks, self.api_key, cancelled=self._cancelled.is_set)
+
+        if self.on_done is not None:
+            self.on_done(index)
+        return {
+            "index": index,
+            "path": path,
+            "start_seconds": start_seconds,
+            "text": text,
+            "segments": segments,
+            "chunks": chunks,
+            "summaries": summaries,
+            "removed_seconds": result.get("removed_seconds", 0.0),
+        }
+
+    def results(self, cancelled: Optional[Callable[[], bool]] = None) -> list:
+        """Wait for every submitted segment. Failed segments are retried once on the calling thread."""
+        with self._lock:
+            jobs = list(self._jobs)
+        results = []
+        for job, future in jobs:
+            try:
+                while True:
+                    if cancelled is not None and cancelled():
+                        raise CancelledError()
+                    try:
+                        results.append(future.result(timeout=CANCEL_POLL_SECONDS))
+                        break
+                    except TimeoutError:
+                        continue
+            except CancelledError:
+                raise
+            except Exception as exc:
+                print(f"Segment {job[1] + 1} failed ({exc}); retrying")
+                results.append(self._process(*job))
+        return results
+
+    def cancel(self):
+        self._cancelled.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+def merge_segment_results(results: list) -> dict:
+    """Join per-segment transcripts, chunks and summaries into one session, renumbering chunk ids."""
+    texts = []
+    segments = []
+    chunks = []
+    summaries = []
+    removed_seconds = 0.0
+    for result in sorted(results, key=lambda r: r["index"]):
+        if result["text"]:
+            texts.append(result["text"])
+        segments.extend(result["segments"])
+        offset = len(chunks)
+        for chunk in result["chunks"]:
+            chunks.append({**chunk, "id": offset + chunk["id"], "segment": result["index"] + 1})
+        for summary in result["summaries"]:
+            summaries.append({**summary, "id": offset + summary["id"]})
+        removed_seconds += result["removed_seconds"]
+    return {
+        "text": "\n\n".join(texts),
+        "segments": segments,
+        "chunks": chunks,
+        "summaries": summaries,
+        "removed_seconds": removed_seconds,
+    }
@@ -0,0 +1,34 @@
+import threading
+from pathlib import Path
+
+from PySide6.QtCore import QObject, QRunnable, Signal
+
+from ...recording.formats import transcode_recordings
+
+
+class TranscodeSignals(QObject):
+    finished = Signal(list)
+
+
+class TranscodeWorker(QRunnable):
+    """Compresses old WAV recordings in the data folder without blocking the UI."""
+
+    def __init__(self, data_dir: Path, file_format: str):
+        super().__init__()
+        self.data_dir = Path(data_dir)
+        self.file_format = file_format
+        self.signals = TranscodeSignals()
+        self._stop_event = threading.Event()
+        self.setAutoDelete(False)
+
+    def stop(self):
+        # Checked between files; the one in progress is finished first
+        self._stop_event.set()
+
+    def run(self):
+        try:
+            transcoded = transcode_recordings(self.data_dir, self.file_format, should_stop=self._stop_event.is_set)
+        except Exception as exc:
+            print(f"Transcoding error: {exc}")
+            transcoded = []
+        self.signals.finished.emit([str(path) for path in transcoded])
@@ -0,0 +1,206 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from .scheduler import get_scheduler
+
+# Bump when prompts change in a way the messages alone don't capture
+CACHE_VERSION = 1
+DEFAULT_CACHE_PATH = Path.home() / ".retention_pipeline" / "llm_cache.sqlite3"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_AGE_SECONDS = 90 * 24 * 3600
+# Eviction scans the table, so it runs every this many writes rather than on each one
+EVICT_EVERY = 50
+
+
+class ResponseCache:
+    """
+    Chat completion responses in SQLite, keyed by a hash of the endpoint,
+    model, messages and request parameters. Only deterministic (temperature 0)
+    requests are cached. Entries older than `max_age` are dropped, and the
+    least recently used ones go once the stored responses pass `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        path=DEFAULT_CACHE_PATH,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_age: float = DEFAULT_MAX_AGE_SECONDS,
+    ):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._connection = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(str(self.path), check_same_thread=False, timeout=10)
+            # WAL lets the GUI and a CLI run share the file
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, model TEXT, response TEXT, size INTEGER, created REAL, accessed REAL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+            self._connection = connection
+        return self._connection
+
+    @staticmethod
+    def cacheable(params: dict) -> bool:
+        return params.get("temperature") == 0 and not params.get("stream")
+
+    @staticmethod
+    def key(params: dict, endpoint: str = "") -> str:
+        # The endpoint keeps responses from other OpenAI-compatible servers apart from the real API's
+        payload = json.dumps(
+            {"version": CACHE_VERSION, "endpoint": endpoint, **params}, sort_keys=True, ensure_ascii=False, default=str
+        )
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=20).hexdigest()
+
+    def get(self, params: dict, endpoint: str = "") -> Optional[str]:
+        """The stored response JSON for this request, or None."""
+        key = self.key(params, endpoint)
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute(
+                "SELECT response FROM responses WHERE key = ? AND created >= ?", (key, now - self.max_age)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            connection.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            connection.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, params: dict, response_json: str, endpoint: str = ""):
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (self.key(params, endpoint), params.get("model"), response_json, len(response_json), now, now),
+            )
+            connection.commit()
+            self._writes += 1
+            if self._writes % EVICT_EVERY == 1:
+                self._evict(connection)
+
+    def delete(self, params: dict, endpoint: str = ""):
+        with self._lock:
+            connection = self._connect()
+            connection.execute("DELETE FROM responses WHERE key = ?", (self.key(params, endpoint),))
+            connection.commit()
+
+    def _evict(self, connection: sqlite3.Connection):
+        connection.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.max_age,))
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total > self.max_bytes:
+            # Walk from least recently used until enough is freed
+            doomed = []
+            for key, size in connection.execute("SELECT key, size FROM responses ORDER BY accessed"):
+                if total <= self.max_bytes:
+                    break
+                doomed.append((key,))
+                total -= size
+            connection.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        connection.commit()
+
+    def evict(self):
+        with self._lock:
+            self._evict(self._connect())
+
+    def clear(self):
+        with self._lock:
+            connection = self._connect()
+            connection.execute("DELETE FROM responses")
+            connection.commit()
+            connection.execute("VACUUM")
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_cache() -> ResponseCache:
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
+
+
+def _lookup(client, params: dict, cache: bool):
+    if not cache or not ResponseCache.cacheable(params):
+        return None
+    try:
+        cached = get_cache().get(params, str(client.base_url))
+    except sqlite3.Error as exc:
+        print(f"LLM cache unavailable: {exc}")
+        return None
+    if cached is None:
+        return None
+    from openai.types.chat import ChatCompletion
+
+    return ChatCompletion.model_validate_json(cached)
+
+
+def _store(client, params: dict, response, cache: bool):
+    if not cache or not ResponseCache.cacheable(params):
+        return
+    try:
+        get_cache().put(params, response.model_dump_json(), str(client.base_url))
+    except sqlite3.Error as exc:
+        print(f"Could not cache LLM response: {exc}")
+
+
+def forget(client, cache: bool = True, **params):
+    """Drop the cached response to this request, e.g. one the caller couldn't parse, so the next call asks again."""
+    if not cache or not ResponseCache.cacheable(params):
+        return
+    try:
+        get_cache().delete(params, str(client.base_url))
+    except sqlite3.Error as exc:
+        print(f"Could not drop cached LLM response: {exc}")
+
+
+def complete(client, cache: bool = True, **params):
+    """chat.completions.create() through the cache and the shared scheduler. `cache=False` bypasses both read and write."""
+    response = _lookup(client, params, cache)
+    if response is None:
+        response = get_scheduler().chat_sync(client, **params)
+        _store(client, params, response, cache)
+    return response
+
+
+async def complete_async(client, cache: bool = True, **params):
+    """complete() for AsyncOpenAI clients. SQLite calls run in a thread so they don't stall the event loop."""
+    response = await asyncio.to_thread(_lookup, client, params, cache)
+    if response is None:
+        response = await get_scheduler().chat(client, **params)
+        await asyncio.to_thread(_store, client, params, response, cache)
+    return response
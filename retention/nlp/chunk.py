@@ -1,19 +1,27 @@
-import tiktoken
 import typer
 import json
+from functools import lru_cache
 from pathlib import Path
 
-encoding = tiktoken.get_encoding("o200k_base")
 app = typer.Typer()
 
 chunk_size=500
 overlap=50
 
 
+@lru_cache(maxsize=None)
+def get_encoding():
+    # tiktoken loads its BPE tables on first use, keep that off the import path
+    import tiktoken
+
+    return tiktoken.get_encoding("o200k_base")
+
+
 @app.command()
 
 def chunk_text(transcription: str):
     
+    encoding = get_encoding()
     result = encoding.encode(transcription)
 
     i = 0
@@ -32,16 +40,73 @@ def chunk_text(transcription: str):
 
 
 
+def chunk_segments(segments: list):
+    """
+    Chunk a segment transcript on segment boundaries, so every chunk keeps
+    the start/end time of the audio it came from. Chunks hold up to
+    `chunk_size` tokens and overlap by about `overlap` tokens of whole segments.
+    """
+    encoding = get_encoding()
+    pieces = []
+    for segment in segments:
+        text = str(segment.get("text", "")).strip()
+        if not text:
+            continue
+        tokens = len(encoding.encode(text))
+        if tokens > chunk_size:
+            # A single oversized segment is split by tokens and shares its timestamps
+            for part in chunk_text(text):
+                pieces.append((part["text"], len(encoding.encode(part["text"])), segment))
+        else:
+            pieces.append((text, tokens, segment))
+
+    chunks = []
+    i = 0
+    while i < len(pieces):
+        j = i
+        total = 0
+        while j < len(pieces) and (j == i or total + pieces[j][1] <= chunk_size):
+            total += pieces[j][1]
+            j += 1
+        chunks.append({
+            "id": len(chunks) + 1,
+            "text": " ".join(piece[0] for piece in pieces[i:j]),
+            "start": pieces[i][2].get("start"),
+            "end": pieces[j - 1][2].get("end"),
+        })
+        if j >= len(pieces):
+            break
+        # Step back over whole segments worth roughly `overlap` tokens; always
+        # repeat the last segment unless it is long, so context carries over
+        back = j
+        carried = 0
+        while back - 1 > i and (
+            carried + pieces[back - 1][1] <= overlap
+            or (back == j and pieces[back - 1][1] <= chunk_size // 4)
+        ):
+            back -= 1
+            carried += pieces[back][1]
+        i = back
+
+    return chunks
+
+
 @app.command()
 def chunk_file(filename: str, output_dir : str = "data/chunks"):
     """
-    CLI Command: reads a transcription file, chunks it, writes it to JSON
+    CLI Command: reads a transcription (.txt or .segments.jsonl), chunks it, writes it to JSON
     """
-    input_path = Path(filename)
-    output_path = Path(output_dir) / f"{input_path.stem}_chunks.json"
+    from retention.asr.transcript import TRANSCRIPT_SUFFIX, TranscriptReader
 
-    transcription = input_path.read_text(encoding="UTF-8")
-    chunks = chunk_text(transcription)
+    input_path = Path(filename)
+    if input_path.name.endswith(TRANSCRIPT_SUFFIX):
+        # Segment transcripts chunk on segment boundaries and keep timestamps
+        stem = input_path.name[: -len(TRANSCRIPT_SUFFIX)]
+        chunks = chunk_segments(list(TranscriptReader(input_path)))
+    else:
+        stem = input_path.stem
+        chunks = chunk_text(input_path.read_text(encoding="UTF-8"))
+    output_path = Path(output_dir) / f"{stem}_chunks.json"
 
 
     output_path.parent.mkdir(parents=True, exist_ok=True)
@@ -1,5 +1,5 @@
 from retention.nlp.prompts import DEEP_FLASHCARD_PROMPT, QUICK_FLASHCARD_PROMPT
-from openai import OpenAI
+from retention.nlp.cache import complete
 import typer
 from dotenv import load_dotenv
 from typing import Optional
@@ -29,19 +29,21 @@ def _resolve_api_key(api_key: Optional[str]) -> str:
 
 def get_client(api_key: Optional[str]):
     """Get OpenAI client using API key provided by caller (entry point)."""
+    from openai import OpenAI
+
     key = _resolve_api_key(api_key)
     return OpenAI(api_key=key)
 
 
 @app.command()
 
-def deep_flashcard(filename: str, output_dir: str = "data/flashcards", api_key: Optional[str] = None):
+def deep_flashcard(filename: str, output_dir: str = "data/flashcards", api_key: Optional[str] = None, cache: bool = True):
     """
     Convert the raw transcript into Anki-styled flashcards. A bit heavy on usage, but good for retaining maximum knowledge.
     """
 
     resolved_api_key = _resolve_api_key(api_key)
-    client = OpenAI(api_key=resolved_api_key)
+    client = get_client(resolved_api_key)
 
     # Load the JSON chunks
     chunks = json.load(open(filename, "r", encoding="UTF-8"))
@@ -63,7 +65,9 @@ def deep_flashcard(filename: str, output_dir: str = "data/flashcards", api_key:
 
 
         # Send the prompt to the OpenAI API
-        response = client.chat.completions.create(
+        response = complete(
+            client,
+            cache=cache,
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": "You are a super learning student who is known as the best at extracting knowledge from courses"},
@@ -84,13 +88,13 @@ def deep_flashcard(filename: str, output_dir: str = "data/flashcards", api_key:
 
 
 @app.command()
-def quick_flashcard(filename: str, output_dir: str = "data/flashcards", api_key: Optional[str] = None):
+def quick_flashcard(filename: str, output_dir: str = "data/flashcards", api_key: Optional[str] = None, cache: bool = True):
     """
     Convert the raw transcript into Anki-styled flashcards. A bit heavy on usage, but good for retaining maximum knowledge.
     """
     
     resolved_api_key = _resolve_api_key(api_key)
-    client = OpenAI(api_key=resolved_api_key)
+    client = get_client(resolved_api_key)
 
     # Load the summaries
     summaries = json.load(open(filename, "r", encoding="UTF-8"))
@@ -108,7 +112,9 @@ def quick_flashcard(filename: str, output_dir: str = "data/flashcards", api_key:
     user_prompt = QUICK_FLASHCARD_PROMPT.format(summaries=summaries)
 
     # Send the prompt to the OpenAI API
-    response = client.chat.completions.create(
+    response = complete(
+        client,
+        cache=cache,
         model="gpt-4o-mini",
         messages=[
             {"role": "system", "content": "You are a super learning student who is known as the best at extracting knowledge from courses"},
@@ -0,0 +1,86 @@
+import hashlib
+import json
+import threading
+from pathlib import Path
+
+JOURNAL_SUFFIX = ".journal.jsonl"
+
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+def journal_path(output_dir, base_name: str) -> Path:
+    return Path(output_dir) / f"{base_name}_summary{JOURNAL_SUFFIX}"
+
+
+def chunks_fingerprint(chunks: list) -> str:
+    payload = json.dumps(chunks, sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class SummaryJournal:
+    """
+    Append-only JSONL checkpoint of a summarization job. The first line
+    identifies the chunks it belongs to; every later line records one chunk
+    as done (with its summary) or failed, as soon as that chunk finishes,
+    so a crashed or partly failed run can be resumed without redoing work.
+    """
+
+    def __init__(self, path, chunks: list, resume: bool = False):
+        self.path = Path(path)
+        self.fingerprint = chunks_fingerprint(chunks)
+        self._lock = threading.Lock()
+        self.records = self._load() if resume else {}
+        if not self.records:
+            # Fresh job, or the journal belonged to different chunks
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"job": self.fingerprint, "chunks": len(chunks)}) + "\n")
+
+    def _load(self) -> dict:
+        records = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                header = json.loads(f.readline() or "{}")
+                if header.get("job") != self.fingerprint:
+                    print(f"{self.path.name} is for different chunks; starting over")
+                    return {}
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A line cut short by a crash
+                        continue
+                    # Later lines win: a retried chunk replaces its earlier failure
+                    records[record["id"]] = record
+        except (OSError, ValueError):
+            return {}
+        return records
+
+    def _append(self, record: dict):
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.records[record["id"]] = record
+
+    def record_done(self, summary: dict):
+        self._append({"id": summary["id"], "status": STATUS_DONE, "summary": summary})
+
+    def record_failed(self, chunk_id, error: str):
+        self._append({"id": chunk_id, "status": STATUS_FAILED, "error": error})
+
+    def completed(self) -> dict:
+        """Chunk id -> summary for every chunk already done."""
+        return {
+            chunk_id: record["summary"]
+            for chunk_id, record in self.records.items()
+            if record.get("status") == STATUS_DONE
+        }
+
+    def failed(self) -> list:
+        return [chunk_id for chunk_id, record in self.records.items() if record.get("status") == STATUS_FAILED]
+
+    def pending(self, chunks: list) -> list:
+        """Chunks that are missing from the journal or failed last time."""
+        done = self.completed()
+        return [chunk for chunk in chunks if chunk["id"] not in done]
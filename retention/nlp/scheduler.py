@@ -0,0 +1,360 @@
+import asyncio
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+# Defaults for gpt-4o-mini on a tier 1 key; override per org with the env vars
+DEFAULT_RPM = int(os.getenv("RETENTION_OPENAI_RPM", "500"))
+DEFAULT_TPM = int(os.getenv("RETENTION_OPENAI_TPM", "200000"))
+DEFAULT_CONCURRENCY = 8
+MAX_CONCURRENCY = 32
+MAX_RETRIES = 6
+# Assumed completion length when a request doesn't set max_tokens
+DEFAULT_OUTPUT_TOKENS = 512
+
+_DURATION_PART = re.compile(r"([\d.]+)(ms|s|m|h)")
+_DURATION_SECONDS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_reset(value: Optional[str]) -> Optional[float]:
+    """Seconds in an x-ratelimit-reset-* header such as "6m0s", "1.5s" or "20ms"."""
+    if not value:
+        return None
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(amount) * _DURATION_SECONDS[unit] for amount, unit in parts)
+
+
+_encoding_unavailable = False
+
+
+def count_tokens(text: str) -> int:
+    global _encoding_unavailable
+    from .chunk import get_encoding
+
+    if not _encoding_unavailable:
+        try:
+            return len(get_encoding().encode(text))
+        except Exception as exc:
+            # tiktoken fetches its tables on first use; offline, fall back to ~4 characters per token
+            print(f"Token counting unavailable ({exc}); estimating from length")
+            _encoding_unavailable = True
+    return len(text) // 4 + 1
+
+
+def estimate_tokens(messages: list, max_tokens: Optional[int] = None) -> int:
+    """Tokens a chat request will be billed for: the prompt plus the completion it may produce."""
+    # Every message carries a few tokens of role/formatting overhead
+    prompt = sum(count_tokens(str(message.get("content") or "")) + 4 for message in messages) + 3
+    return prompt + (max_tokens or DEFAULT_OUTPUT_TOKENS)
+
+
+class TokenBucket:
+    """
+    Refills at `per_minute` / 60 per second up to `per_minute`. reserve()
+    takes the amount immediately, letting the level go negative, and returns
+    how long the caller must wait for that debt to be repaid; this works the
+    same for threads and coroutines.
+    """
+
+    def __init__(self, per_minute: float):
+        self.per_minute = float(per_minute)
+        self.level = float(per_minute)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        rate = self.per_minute / 60.0
+        self.level = min(self.per_minute, self.level + (now - self._updated) * rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            # A request larger than the whole bucket still gets through, after a full refill
+            self.level -= min(amount, self.per_minute)
+            return max(0.0, -self.level / (self.per_minute / 60.0))
+
+    def refund(self, amount: float):
+        with self._lock:
+            self.level = min(self.per_minute, self.level + amount)
+
+    def observe(self, limit: Optional[float], remaining: Optional[float], reset_seconds: Optional[float]):
+        """Align with the server's count: it also sees requests from other processes on the same key."""
+        with self._lock:
+            self._refill(time.monotonic())
+            if limit:
+                # The key's real limit, higher or lower than the configured default
+                self.per_minute = float(limit)
+            if remaining is not None and remaining < self.level:
+                self.level = float(remaining)
+                if remaining <= 0 and reset_seconds:
+                    # Empty until the server's window resets
+                    self.level = -reset_seconds * self.per_minute / 60.0
+
+
+class RequestScheduler:
+    """
+    Paces chat completion requests for one API key. Each request reserves its
+    estimated tokens from RPM/TPM token buckets before it is sent, response
+    x-ratelimit-* headers pull the buckets in line with the server, and the
+    number of requests in flight adapts AIMD-style: +1 after a window of
+    successes, halved on a burst of 429s. 429s, timeouts and 5xx are retried with
+    jittered exponential backoff, honouring retry-after when given.
+    """
+
+    def __init__(
+        self,
+        rpm: int = DEFAULT_RPM,
+        tpm: int = DEFAULT_TPM,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        max_concurrency: int = MAX_CONCURRENCY,
+        max_retries: int = MAX_RETRIES,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+    ):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.limit = float(max(1, concurrency))
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.in_flight = 0
+        self.retries = 0
+        self.throttled = 0
+        self.completed = 0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        # (loop, future) per waiting coroutine; one scheduler serves every event loop and thread
+        self._async_waiters = deque()
+
+    def set_max_concurrency(self, maximum: int):
+        """Cap how far the adaptive limit may grow, e.g. from a --concurrency option."""
+        with self._released:
+            self.max_concurrency = max(1, maximum)
+            self.limit = min(self.limit, float(self.max_concurrency))
+            self._notify()
+
+    def _enter_sync(self):
+        with self._released:
+            while self.in_flight >= int(self.limit):
+                self._released.wait()
+            self.in_flight += 1
+
+    async def _enter_async(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                with self._lock:
+                    try:
+                        self._async_waiters.remove((loop, waiter))
+                    except ValueError:
+                        # Already handed a free slot it won't take; pass it on
+                        self._notify()
+                raise
+
+    def _notify(self):
+        # Called with the lock held: wake sync waiters, and as many coroutines as there are free slots
+        self._released.notify_all()
+        free = int(self.limit) - self.in_flight
+        while free > 0 and self._async_waiters:
+            loop, waiter = self._async_waiters.popleft()
+            try:
+                loop.call_soon_threadsafe(_wake, waiter)
+            except RuntimeError:
+                # That waiter's loop has closed
+                continue
+            free -= 1
+
+    def _exit(self, throttled: bool = False, succeeded: bool = False):
+        with self._released:
+            self.in_flight -= 1
+            if throttled:
+                self.throttled += 1
+                now = time.monotonic()
+                # Requests in flight together tend to be throttled together; halve once per burst
+                if now - self._last_decrease > 1.0:
+                    self.limit = max(1.0, self.limit / 2)
+                    self._last_decrease = now
+            elif succeeded:
+                self.completed += 1
+                # One extra slot per window's worth of successes
+                self.limit = min(float(self.max_concurrency), self.limit + 1.0 / self.limit)
+            self._notify()
+
+    def _observe(self, headers):
+        if headers is None:
+            return
+
+        def number(name):
+            try:
+                return float(headers.get(name))
+            except (TypeError, ValueError):
+                return None
+
+        self.requests.observe(
+            number("x-ratelimit-limit-requests"),
+            number("x-ratelimit-remaining-requests"),
+            parse_reset(headers.get("x-ratelimit-reset-requests")),
+        )
+        self.tokens.observe(
+            number("x-ratelimit-limit-tokens"),
+            number("x-ratelimit-remaining-tokens"),
+            parse_reset(headers.get("x-ratelimit-reset-tokens")),
+        )
+
+    def _classify(self, exc) -> Optional[str]:
+        """Return "throttled" or "transient" for retryable errors, None for everything else."""
+        import openai
+
+        if isinstance(exc, openai.RateLimitError):
+            return "throttled"
+        if isinstance(exc, openai.APIConnectionError):
+            return "transient"
+        if isinstance(exc, openai.APIStatusError) and exc.status_code >= 500:
+            return "transient"
+        return None
+
+    def _backoff(self, exc, attempt: int) -> float:
+        headers = getattr(getattr(exc, "response", None), "headers", None)
+        if headers is not None:
+            self._observe(headers)
+            for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+                try:
+                    return float(headers.get(name)) * scale + random.uniform(0, self.base_delay)
+                except (TypeError, ValueError):
+                    continue
+        # Full jitter: spreads retries from concurrent requests apart
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _reserve(self, cost: int) -> float:
+        return max(self.requests.reserve(1), self.tokens.reserve(cost))
+
+    def _refund(self, cost: int):
+        # A rejected attempt wasn't billed; the retry reserves again
+        self.requests.refund(1)
+        self.tokens.refund(cost)
+
+    def _settle(self, cost: int, response):
+        usage = getattr(response, "usage", None)
+        total = getattr(usage, "total_tokens", None)
+        if total is not None and total < cost:
+            # Estimates assume the longest completion; give back what went unused
+            self.tokens.refund(cost - total)
+
+    def chat_sync(self, client, **params):
+        """chat.completions.create() on a sync client, paced and retried."""
+        cost = estimate_tokens(params.get("messages", []), params.get("max_tokens"))
+        raw_create = client.with_options(max_retries=0).chat.completions.with_raw_response.create
+        for attempt in range(self.max_retries + 1):
+            time.sleep(self._reserve(cost))
+            self._enter_sync()
+            succeeded = throttled = False
+            try:
+                raw = raw_create(**params)
+                succeeded = True
+            except Exception as exc:
+                kind = self._classify(exc)
+                throttled = kind == "throttled"
+                if kind is None or attempt == self.max_retries:
+                    raise
+                error = exc
+            finally:
+                # Also on KeyboardInterrupt: a leaked slot is lost to the whole process
+                self._exit(throttled=throttled, succeeded=succeeded)
+            if not succeeded:
+                self.retries += 1
+                self._refund(cost)
+                time.sleep(self._backoff(error, attempt))
+                continue
+            self._observe(raw.headers)
+            response = raw.parse()
+            self._settle(cost, response)
+            return response
+
+    async def chat(self, client, **params):
+        """chat.completions.create() on an AsyncOpenAI client, paced and retried."""
+        cost = estimate_tokens(params.get("messages", []), params.get("max_tokens"))
+        raw_create = client.with_options(max_retries=0).chat.completions.with_raw_response.create
+        for attempt in range(self.max_retries + 1):
+            await asyncio.sleep(self._reserve(cost))
+            await self._enter_async()
+            succeeded = throttled = False
+            try:
+                raw = await raw_create(**params)
+                succeeded = True
+            except Exception as exc:
+                kind = self._classify(exc)
+                throttled = kind == "throttled"
+                if kind is None or attempt == self.max_retries:
+                    raise
+                error = exc
+            finally:
+                # Also on cancellation: a leaked slot is lost to the whole process
+                self._exit(throttled=throttled, succeeded=succeeded)
+            if not succeeded:
+                self.retries += 1
+                self._refund(cost)
+                await asyncio.sleep(self._backoff(error, attempt))
+                continue
+            self._observe(raw.headers)
+            response = raw.parse()
+            self._settle(cost, response)
+            return response
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "concurrency": int(self.limit),
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "retries": self.retries,
+                "throttled": self.throttled,
+                "rpm": self.requests.per_minute,
+                "tpm": self.tokens.per_minute,
+            }
+
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> RequestScheduler:
+    """The process-wide scheduler; summaries and flashcards share one key, so they share its budget."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler()
+        return _scheduler
+
+
+def configure_scheduler(**options) -> RequestScheduler:
+    """Replace the shared scheduler, e.g. with the RPM/TPM limits of a different tier."""
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = RequestScheduler(**options)
+        return _scheduler
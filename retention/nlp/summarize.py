@@ -1,7 +1,11 @@
 from retention.nlp.prompts import CHUNK_SUMMARY_PROMPT, MASTER_SUMMARY_PROMPT
-from openai import OpenAI
+from retention.nlp.cache import complete, complete_async, forget
+from retention.nlp.journal import SummaryJournal, journal_path
+from retention.nlp.scheduler import MAX_CONCURRENCY, count_tokens, get_scheduler
 from dotenv import load_dotenv
-from typing import Optional
+from concurrent.futures import CancelledError
+from typing import Callable, Optional
+import asyncio
 import os
 import typer
 from pathlib import Path
@@ -11,6 +15,14 @@ app = typer.Typer()
 
 load_dotenv()
 
+# Ceiling on requests in flight; within it the scheduler adapts to the rate limits it sees
+DEFAULT_CONCURRENCY = MAX_CONCURRENCY
+SUMMARY_MODEL = "gpt-4o-mini"
+# Most summary tokens fed to one master summary call; longer lectures are reduced in a tree
+DEFAULT_REDUCE_TOKENS = 8000
+# How often a running job checks whether the caller cancelled it
+CANCEL_POLL_SECONDS = 0.25
+
 def _resolve_api_key(api_key: Optional[str]) -> str:
     candidates = [
         api_key,
@@ -27,72 +39,170 @@ def _resolve_api_key(api_key: Optional[str]) -> str:
     raise ValueError("API key is required")
 
 
-def get_client(api_key: Optional[str]):
+def get_client(api_key: Optional[str], base_url: Optional[str] = None):
     """Get OpenAI client using API key provided by caller (entry point)."""
+    from openai import OpenAI
+
     key = _resolve_api_key(api_key)
-    return OpenAI(api_key=key)
+    return OpenAI(api_key=key, base_url=base_url)
 
 
-@app.command()
-def summarize_file(filename: str, output_dir: str = "data/summaries", api_key: Optional[str] = None):
-    """
-    Summarize each chunk from a chunks.json file into a single Markdown file.
-    """
-    output_dir_path = Path(output_dir)
-    output_dir_path.mkdir(parents=True, exist_ok=True)
-    resolved_api_key = _resolve_api_key(api_key)
-    client = OpenAI(api_key=resolved_api_key)
+def get_async_client(api_key: Optional[str], base_url: Optional[str] = None):
+    """AsyncOpenAI client; `base_url` points it at any OpenAI-compatible server."""
+    from openai import AsyncOpenAI
 
-    # Load chunks.json
-    chunks = json.load(open(filename, "r", encoding="utf-8"))    
-    summaries = []
+    key = _resolve_api_key(api_key)
+    return AsyncOpenAI(api_key=key, base_url=base_url)
 
-    # Build output path
-    path = Path(filename)
-    # Extract base name by removing _chunks from the stem
-    base_name = path.stem.replace("_chunks", "")
-    summaries_path = output_dir_path / f"{base_name}_summary.md"
-    summaries_json_path = output_dir_path / f"{base_name}_summaries.json"
 
-    # Loop through chunks
-    for chunk in chunks:
-        text = chunk["text"]
+def _time_range(summary: dict) -> str:
+    if summary.get("start") is None:
+        return ""
+    start, end = (int(summary[key]) for key in ("start", "end"))
+    return f" ({start // 60}:{start % 60:02d}-{end // 60}:{end % 60:02d})"
+
 
-        # Format prompt with chunk text
-        user_prompt = CHUNK_SUMMARY_PROMPT.format(chunk_text=text)
+def _chunk_messages(chunk: dict) -> list:
+    return [
+        {"role": "system", "content": "You are a summarizer that outputs only JSON."},
+        {"role": "user", "content": CHUNK_SUMMARY_PROMPT.format(chunk_text=chunk["text"])},
+    ]
 
-        # Send request to OpenAI
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a summarizer that outputs only JSON."},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0
-        )
 
-        content = response.choices[0].message.content
+def _parse_summary(chunk: dict, content) -> Optional[dict]:
+    # Parse JSON safely
+    try:
+        parsed = json.loads(content) # type: ignore
+    except (json.JSONDecodeError, TypeError):
+        parsed = None
+    if not isinstance(parsed, dict):
+        typer.echo(f"Failed to parse JSON for chunk {chunk['id']}, raw output:\n{content}")
+        return None
+
+    # Store structured summary
+    summary = {
+        "id": chunk["id"],
+        "summary": parsed.get("summary", ""),
+        "key_points": parsed.get("key_points", []),
+        "questions": parsed.get("questions", [])
+    }
+    # Chunks made from segment transcripts link back to the audio
+    if chunk.get("start") is not None:
+        summary["start"] = chunk["start"]
+        summary["end"] = chunk["end"]
+    return summary
+
+
+def summarize_chunks(chunks: list, client, cache: bool = True) -> list:
+    """
+    Summarize each chunk into a structured dict, in chunk order, one request at a time.
+    """
+    summaries = []
+    for chunk in chunks:
+        params = {"model": SUMMARY_MODEL, "messages": _chunk_messages(chunk), "temperature": 0}
+        response = complete(client, cache=cache, **params)
+        summary = _parse_summary(chunk, response.choices[0].message.content)
+        if summary is None:
+            # Otherwise a retry would get the same bad reply back from the cache
+            forget(client, cache=cache, **params)
+        else:
+            summaries.append(summary)
+    return summaries
+
+
+async def summarize_chunks_async(
+    chunks: list,
+    client,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    cache: bool = True,
+    journal: Optional[SummaryJournal] = None,
+) -> list:
+    """
+    Summarize chunks on an AsyncOpenAI client, with the shared scheduler
+    deciding how many requests are in flight, up to `concurrency`. Results
+    come back in chunk order regardless of which request finishes first.
+    With a journal, each chunk is checkpointed the moment it finishes; a
+    failed request doesn't stop the others, and its error is raised once
+    they are all done.
+    """
+    get_scheduler().set_max_concurrency(concurrency)
 
-        # Parse JSON safely
+    async def _summarize(chunk):
+        params = {"model": SUMMARY_MODEL, "messages": _chunk_messages(chunk), "temperature": 0}
         try:
-            parsed = json.loads(content) # type: ignore
-        except json.JSONDecodeError:
-            typer.echo(f"Failed to parse JSON for chunk {chunk['id']}, raw output:\n{content}")
-            continue
+            response = await complete_async(client, cache=cache, **params)
+        except Exception as exc:
+            if journal is not None:
+                journal.record_failed(chunk["id"], str(exc))
+            raise
+        summary = _parse_summary(chunk, response.choices[0].message.content)
+        if summary is None:
+            # Otherwise --resume would get the same bad reply back from the cache
+            await asyncio.to_thread(forget, client, cache, **params)
+        if journal is not None:
+            if summary is None:
+                journal.record_failed(chunk["id"], "response was not valid JSON")
+            else:
+                journal.record_done(summary)
+        return summary
+
+    results = await asyncio.gather(*(_summarize(chunk) for chunk in chunks), return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return [summary for summary in results if summary is not None]
+
+
+async def _until_cancelled(coro, cancelled: Optional[Callable[[], bool]]):
+    """Await `coro`, cancelling it (and its in-flight requests) as soon as `cancelled()` returns True."""
+    task = asyncio.ensure_future(coro)
+    if cancelled is None:
+        return await task
+    while not task.done():
+        await asyncio.wait({task}, timeout=CANCEL_POLL_SECONDS)
+        if not task.done() and cancelled():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            # The worker threads' CancelledError, not asyncio's BaseException
+            raise CancelledError()
+    return task.result()
+
+
+def summarize_chunks_concurrently(
+    chunks: list,
+    api_key: Optional[str] = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    base_url: Optional[str] = None,
+    cache: bool = True,
+    journal: Optional[SummaryJournal] = None,
+    cancelled: Optional[Callable[[], bool]] = None,
+) -> list:
+    """
+    Blocking wrapper around summarize_chunks_async for worker threads and
+    the CLI: wall time is roughly the slowest few requests, not their sum.
+    `cancelled` is polled while requests run; once it returns True they are
+    abandoned and CancelledError is raised.
+    """
+
+    async def _run():
+        async with get_async_client(api_key, base_url) as client:
+            return await _until_cancelled(summarize_chunks_async(chunks, client, concurrency, cache, journal), cancelled)
 
-        # Store structured summary
-        summaries.append({
-            "id": chunk["id"],
-            "summary": parsed.get("summary", ""),
-            "key_points": parsed.get("key_points", []),
-            "questions": parsed.get("questions", [])
-        })
+    return asyncio.run(_run())
 
+
+def write_summaries(summaries: list, summaries_path: Path, summaries_json_path: Path):
+    """
+    Write chunk summaries to Markdown plus the JSON sidecar used by quick flashcards.
+    """
     # Write all summaries to Markdown
     with open(summaries_path, "w", encoding="utf-8") as f:
         f.write("# Lecture Summary\n\n")
         for s in summaries:
-            f.write(f"## Chunk {s['id']}\n")
+            f.write(f"## Chunk {s['id']}{_time_range(s)}\n")
             f.write(f"**Summary:** {s['summary']}\n\n")
             f.write("**Key Points:**\n")
             for p in s["key_points"]:
@@ -103,60 +213,194 @@ def summarize_file(filename: str, output_dir: str = "data/summaries", api_key: O
             f.write("\n\n")
 
     # Write sidecar JSON for quick flashcards
-    summaries_json_path = output_dir_path / f"{path.stem}_summaries.json"
     with open(summaries_json_path, "w", encoding="utf-8") as f:
         json.dump(summaries, f, ensure_ascii=False, indent=2)
 
+
+@app.command()
+def summarize_file(
+    filename: str,
+    output_dir: str = "data/summaries",
+    api_key: Optional[str] = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    base_url: Optional[str] = None,
+    cache: bool = True,
+    resume: bool = False,
+    cancelled: Optional[Callable[[], bool]] = None,
+):
+    """
+    Summarize each chunk from a chunks.json file into a single Markdown file.
+    Responses are reused from the LLM cache unless `cache` is off. Progress
+    is journaled next to the output; `resume` only summarizes chunks the
+    journal doesn't have as done. `cancelled` stops the job mid-request.
+    Returns the ids of chunks that failed; the journal keeps them for --resume.
+    """
+    output_dir_path = Path(output_dir)
+    output_dir_path.mkdir(parents=True, exist_ok=True)
+    resolved_api_key = _resolve_api_key(api_key)
+
+    # Load chunks.json
+    chunks = json.load(open(filename, "r", encoding="utf-8"))    
+
+    # Build output path
+    path = Path(filename)
+    # Extract base name by removing _chunks from the stem
+    base_name = path.stem.replace("_chunks", "")
+    summaries_path = output_dir_path / f"{base_name}_summary.md"
+    summaries_json_path = output_dir_path / f"{path.stem}_summaries.json"
+
+    journal = SummaryJournal(journal_path(output_dir_path, base_name), chunks, resume=resume)
+    done = journal.completed()
+    pending = journal.pending(chunks)
+    if resume:
+        typer.echo(f"Resuming: {len(done)} of {len(chunks)} chunks already summarized")
+
+    new = (
+        summarize_chunks_concurrently(pending, resolved_api_key, concurrency, base_url, cache, journal, cancelled)
+        if pending
+        else []
+    )
+    by_id = {**done, **{summary["id"]: summary for summary in new}}
+    summaries = [by_id[chunk["id"]] for chunk in chunks if chunk["id"] in by_id]
+    failed = journal.failed()
+    if failed:
+        typer.echo(f"{len(failed)} chunk(s) could not be summarized ({failed}); rerun with --resume to retry only those")
+    write_summaries(summaries, summaries_path, summaries_json_path)
+
     typer.echo(f" Summaries saved to {summaries_path}")
     typer.echo(f" Summaries JSON saved to {summaries_json_path}")
 
     typer.echo("Creating a master summary...")
 
-    master_summary(summaries, str(summaries_path), api_key=resolved_api_key)
+    master_summary(
+        summaries,
+        str(summaries_path),
+        api_key=resolved_api_key,
+        base_url=base_url,
+        cache=cache,
+        concurrency=concurrency,
+        cancelled=cancelled,
+    )
+    return failed
 
 
 
 
 
-@app.command()
-def master_summary(summaries_list: list, output_path: str, api_key: Optional[str] = None):
-    """
-    Generate a master summary of the most valuable, important and relevant information."""
+def _master_messages(texts: list) -> list:
+    # Join the summaries into a single string
+    summaries = "\n".join(texts)
+    return [
+        {"role": "system", "content": "You are one of the top superlearners in the world"},
+        {"role": "user", "content": MASTER_SUMMARY_PROMPT.format(summaries=summaries)}
+    ]
 
 
-    # Join the summaries into a single string
+def batch_by_tokens(texts: list, budget: int) -> list:
+    """
+    Group consecutive texts into batches of at most `budget` tokens. Every
+    batch holds at least two texts so each reduce round shrinks the list;
+    a single oversized text just makes its batch go over.
+    """
+    batches = []
+    batch = []
+    batch_tokens = 0
+    for text in texts:
+        tokens = count_tokens(text)
+        if len(batch) >= 2 and batch_tokens + tokens > budget:
+            batches.append(batch)
+            batch = []
+            batch_tokens = 0
+        batch.append(text)
+        batch_tokens += tokens
+    if batch:
+        if len(batch) == 1 and batches:
+            # Don't leave a lone text for a round of its own
+            batches[-1].append(batch[0])
+        else:
+            batches.append(batch)
+    return batches
+
+
+async def reduce_summaries_async(
+    texts: list,
+    client,
+    budget: int = DEFAULT_REDUCE_TOKENS,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    cache: bool = True,
+) -> Optional[dict]:
+    """
+    Tree-reduce summaries into one master summary. While the texts exceed
+    `budget` tokens they are split into token-budgeted batches, each batch is
+    summarized in parallel, and the results become the next round's input;
+    the number of rounds grows with the log of the lecture length.
+    """
+    get_scheduler().set_max_concurrency(concurrency)
 
-    summaries = "\n".join([s["summary"] for s in summaries_list])
+    async def _reduce(batch):
+        params = {"model": SUMMARY_MODEL, "messages": _master_messages(batch), "temperature": 0}
+        response = await complete_async(client, cache=cache, **params)
+        content = response.choices[0].message.content
+        try:
+            parsed = json.loads(content) # type: ignore
+        except (json.JSONDecodeError, TypeError):
+            parsed = None
+        if not isinstance(parsed, dict):
+            # Usable as plain text this time, but the next run should ask again
+            await asyncio.to_thread(forget, client, cache, **params)
+            return None, content
+        return parsed, content
+
+    level = 0
+    while sum(count_tokens(text) for text in texts) > budget and len(texts) > 1:
+        level += 1
+        batches = batch_by_tokens(texts, budget)
+        typer.echo(f"Master summary round {level}: reducing {len(texts)} summaries in {len(batches)} batches")
+        # Let every batch finish before raising, so none is cancelled mid-request
+        results = await asyncio.gather(*(_reduce(batch) for batch in batches), return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        # An unparseable partial result is still a usable summary as plain text
+        texts = [parsed.get("summary", "") if parsed else content for parsed, content in results]
+
+    parsed, content = await _reduce(texts)
+    if parsed is None:
+        typer.echo(f"Failed to parse master summary JSON, raw output:\n{content}")
+    return parsed
 
-    # Construct the user prompt
-    master_prompt = MASTER_SUMMARY_PROMPT.format(summaries=summaries)
 
-    # Send the prompt to the OpenAI API
-    client = get_client(api_key)
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": "You are one of the top superlearners in the world"},
-            {"role": "user", "content": master_prompt}
-        ],
-        temperature=0
-    )
+@app.command()
+def master_summary(
+    summaries_list: list,
+    output_path: str,
+    api_key: Optional[str] = None,
+    base_url: Optional[str] = None,
+    cache: bool = True,
+    batch_tokens: int = DEFAULT_REDUCE_TOKENS,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    cancelled: Optional[Callable[[], bool]] = None,
+):
+    """
+    Generate a master summary of the most valuable, important and relevant information.
+    Summaries beyond `batch_tokens` are reduced hierarchically, batches in parallel."""
 
-    # Parse the response
-    content = response.choices[0].message.content
+    texts = [s["summary"] for s in summaries_list]
 
+    async def _run():
+        async with get_async_client(api_key, base_url) as client:
+            return await _until_cancelled(
+                reduce_summaries_async(texts, client, batch_tokens, concurrency, cache), cancelled
+            )
 
-    try:
-        parsed = json.loads(content) # type: ignore
-    except json.JSONDecodeError as e:
-        typer.echo(f"JSON parsing error: {e}")
-        typer.echo("Failed to parse master summary JSON")
+    parsed = asyncio.run(_run())
+    if parsed is None:
         return
 
     # Appending the master summary to the output file
     with open(output_path, "a", encoding="UTF-8") as f:
         f.write("\n\n# Master summary\n\n")
-        f.write(f"**Summary:** {parsed.get("summary", "")}\n\n")
+        f.write(f"**Summary:** {parsed.get('summary', '')}\n\n")
         f.write("**Key Points:**\n")
         for p in parsed.get("key_points", []):
             f.write(f"- {p}\n")
@@ -165,6 +409,5 @@ def master_summary(summaries_list: list, output_path: str, api_key: Optional[str
             f.write(f"- {q}\n")
 
 
-
 if __name__ == "__main__":
     app()
@@ -1,13 +1,24 @@
 # Simple audio recording with sounddevice
+from pathlib import Path
+from time import perf_counter
 from typing import Optional
 
 import numpy as np
 import sounddevice as sd
-import soundfile as sf
 import typer
 
+from .buffer import BlockBuffer
+from .dsp import SPEECH_SAMPLE_RATE, StreamResampler, downmix, float_to_int16
+from .formats import FORMAT_FLAC, recording_suffix, soundfile_options, transcode_recordings
+from .telemetry import CallbackTelemetry
+from .writer import SegmentedWriter, StreamingWriter
+
 app = typer.Typer()
 
+# "native" keeps the device format; "speech" stores 16 kHz mono int16 for Whisper
+CAPTURE_NATIVE = "native"
+CAPTURE_SPEECH = "speech"
+
 
 def list_devices():
     # Get all audio devices
@@ -138,8 +149,11 @@ def record_blocking(duration_seconds, device_id=None, channels=None, preroll_sec
 
 
 def save_wav(path, audio_data, sample_rate):
-    # Save audio data to a WAV file
-    sf.write(file=path, data=audio_data, samplerate=sample_rate)
+    # Save audio data; the suffix picks WAV, FLAC or Ogg/Opus
+    import soundfile as sf
+
+    file_format, subtype = soundfile_options(path)
+    sf.write(file=path, data=audio_data, samplerate=sample_rate, format=file_format, subtype=subtype)
 
 
 def record_system_audio_to_wav(output_path, duration_seconds, device_id=None, channels=None, preroll_seconds=0.25):
@@ -156,24 +170,59 @@ def record_system_audio_to_wav(output_path, duration_seconds, device_id=None, ch
 
 class AudioRecorder:
     # For GUI - start/stop recording on demand
-    def __init__(self, device_id: Optional[int] = None, channels: Optional[int] = None):
+    def __init__(
+        self,
+        device_id: Optional[int] = None,
+        channels: Optional[int] = None,
+        capture_mode: str = CAPTURE_NATIVE,
+        file_format: str = FORMAT_FLAC,
+    ):
         self.requested_device_id = device_id
         self.requested_channels = channels
+        self.capture_mode = capture_mode
+        self.file_format = file_format
         resolved_device_id, resolved_channels, sample_rate, info = resolve_device_settings(
             device_id=device_id,
             channels=channels,
         )
         self.device_id = resolved_device_id
         self.channels = resolved_channels
-        self.sample_rate = sample_rate
+        self.device_sample_rate = sample_rate
+        # Rate of the stored audio, which differs from the device rate in speech mode
+        self.sample_rate = SPEECH_SAMPLE_RATE if capture_mode == CAPTURE_SPEECH else sample_rate
+        self._resampler = None
         self.device_name = info.get('name', 'Unknown input')
         self._device_info = info
         self.stream = None
-        self.audio_data = []
+        self.buffer = None
+        self.writer = None
+        self.output_path = None
+        self.frames_recorded = 0
+        self.telemetry = None
         self.is_recording = False
-
-    def start_recording(self):
-        # Start recording audio
+        # Optional StreamingTranscriber fed with every captured block
+        self.live_transcriber = None
+
+    @property
+    def duration(self) -> float:
+        return self.frames_recorded / self.sample_rate if self.sample_rate else 0.0
+
+    @property
+    def file_suffix(self) -> str:
+        # Falls back to FLAC when Opus can't encode at the capture rate
+        rate = SPEECH_SAMPLE_RATE if self.capture_mode == CAPTURE_SPEECH else self.device_sample_rate
+        return recording_suffix(self.file_format, rate)
+
+    @property
+    def segment_paths(self) -> list:
+        return list(getattr(self.writer, "segment_paths", []))
+
+    def start_recording(self, output_path=None, segment_seconds=None, on_segment=None):
+        # Start recording audio. With output_path, audio streams to disk as it
+        # arrives instead of being kept in memory until save_recording().
+        # With segment_seconds as well, it rolls over to output_path's
+        # _partNNN files and on_segment(path, index, start_seconds) is called
+        # for each finished one.
         if self.is_recording:
             return
 
@@ -188,29 +237,109 @@ class AudioRecorder:
 
         self.device_id = resolved_device_id
         self.channels = resolved_channels
-        self.sample_rate = sample_rate
+        self.device_sample_rate = sample_rate
         self.device_name = info.get('name', 'Unknown input')
         self._device_info = info
-        self.audio_data = []
+
+        stream_settings = self._stream_settings()
+        resampler = self._resampler
+        speech = self.capture_mode == CAPTURE_SPEECH
+        self.frames_recorded = 0
+        self.telemetry = telemetry = CallbackTelemetry(stream_settings["samplerate"])
+        self.buffer = None
+        self.writer = None
+        self.output_path = Path(output_path) if output_path else None
+        if self.output_path is not None and segment_seconds:
+            self.writer = SegmentedWriter(
+                self.output_path,
+                self.sample_rate,
+                segment_seconds,
+                on_segment=on_segment,
+                channels=1 if speech else self.channels,
+            ).start()
+        elif self.output_path is not None:
+            self.writer = StreamingWriter(
+                self.output_path,
+                self.sample_rate,
+                channels=1 if speech else self.channels,
+            ).start()
+        else:
+            self.buffer = BlockBuffer(
+                self.sample_rate,
+                channels=None if speech else self.channels,
+                dtype=np.int16 if speech else np.float32,
+                # 16 kHz int16 is cheap, so give speech mode room for a whole lecture in one block
+                initial_seconds=900.0 if speech else 120.0,
+            )
         self.is_recording = True
 
+        live_transcriber = self.live_transcriber
+        if live_transcriber is not None:
+            live_transcriber.start(self.sample_rate)
+
         def audio_callback(indata, frames, time, status):
+            started = perf_counter()
             if self.is_recording:
-                self.audio_data.append(indata.copy())
+                if resampler is not None:
+                    samples = float_to_int16(resampler.process(downmix(indata)))
+                    if len(samples):
+                        self._store(samples, owned=True)
+                elif speech:
+                    self._store(indata[:, 0], owned=False)
+                else:
+                    self._store(indata, owned=False)
+            telemetry.record(status, time, frames, perf_counter() - started)
 
         try:
             self.stream = sd.InputStream(
                 device=self.device_id,
-                channels=self.channels,
-                samplerate=self.sample_rate,
                 callback=audio_callback,
+                **stream_settings,
             )
             self.stream.start()
         except Exception:
             self.is_recording = False
             self.stream = None
+            if self.writer is not None:
+                self.writer.close()
+                self.writer = None
             raise
 
+    def _store(self, samples, owned):
+        # PortAudio reuses indata, so anything kept past the callback must be copied
+        if self.writer is not None:
+            written = samples if owned else samples.copy()
+            if not self.writer.write(written):
+                # Dropped from the file too; leave it out so live timestamps stay aligned with it
+                return
+        else:
+            # Copies into preallocated storage; the returned views are stable
+            written = self.buffer.write(samples)
+        self.frames_recorded += len(samples)
+        if self.live_transcriber is not None:
+            self._feed_live(self.live_transcriber, written)
+
+    def _stream_settings(self):
+        # Pick the PortAudio stream format for the current capture mode
+        self._resampler = None
+        if self.capture_mode != CAPTURE_SPEECH:
+            self.sample_rate = self.device_sample_rate
+            return {"channels": self.channels, "samplerate": self.sample_rate}
+
+        self.sample_rate = SPEECH_SAMPLE_RATE
+        try:
+            # Many host APIs convert for free; then the callback only stores samples
+            sd.check_input_settings(
+                device=self.device_id,
+                channels=1,
+                samplerate=SPEECH_SAMPLE_RATE,
+                dtype="int16",
+            )
+            return {"channels": 1, "samplerate": SPEECH_SAMPLE_RATE, "dtype": "int16"}
+        except Exception:
+            self._resampler = StreamResampler(self.device_sample_rate, SPEECH_SAMPLE_RATE)
+            return {"channels": self.channels, "samplerate": self.device_sample_rate, "dtype": "float32"}
+
     def stop_recording(self):
         # Stop recording and return audio data
         if not self.is_recording:
@@ -221,18 +350,70 @@ class AudioRecorder:
             self.stream.stop()
             self.stream.close()
             self.stream = None
-        
-        if self.audio_data:
-            audio = np.concatenate(self.audio_data, axis=0)
-            return audio, self.sample_rate
+
+        if self._resampler is not None:
+            # The filter holds back a few milliseconds; emit them now
+            tail = float_to_int16(self._resampler.flush())
+            self._resampler = None
+            if len(tail):
+                self._store(tail, owned=True)
+
+        if self.writer is not None:
+            # Streamed recordings are already on disk; finalize instead of returning samples
+            self.writer.close()
+            if not self.frames_recorded:
+                self.output_path.unlink(missing_ok=True)
+            return None, self.sample_rate
+
+        if self.buffer is not None and len(self.buffer):
+            return self.buffer.view(), self.sample_rate
         return None, self.sample_rate
-    
+
+    def metrics(self) -> dict:
+        # Callback health plus how close the queues and buffers came to their limits
+        metrics = {
+            "device": self.device_name,
+            "capture_mode": self.capture_mode,
+            "device_sample_rate": self.device_sample_rate,
+            "sample_rate": self.sample_rate,
+            "duration_seconds": self.duration,
+        }
+        if self.telemetry is not None:
+            metrics.update(self.telemetry.snapshot())
+
+        high_water = {}
+        if self.writer is not None:
+            high_water["writer_queue_blocks"] = self.writer.max_queue_depth
+            high_water["dropped_blocks"] = self.writer.dropped_blocks
+            if self.writer.error is not None:
+                metrics["writer_error"] = str(self.writer.error)
+        if self.buffer is not None:
+            high_water["buffer_capacity_seconds"] = self.buffer.capacity / self.sample_rate
+        if self.live_transcriber is not None:
+            high_water["live_backlog_blocks"] = self.live_transcriber.max_backlog
+        metrics["high_water"] = high_water
+        return metrics
+
+    @staticmethod
+    def _feed_live(live_transcriber, written):
+        if isinstance(written, list):
+            for part in written:
+                live_transcriber.feed(part)
+        else:
+            live_transcriber.feed(written)
+
     def save_recording(self, output_path):
-        # Save the recorded audio to a file
-        if self.audio_data:
-            audio = np.concatenate(self.audio_data, axis=0)
-            save_wav(output_path, audio, self.sample_rate)
-            return output_path
+        # Save the recorded audio to a file, block by block
+        if isinstance(self.writer, SegmentedWriter):
+            # Segments stay where they are; there is no single file to move
+            return None
+        if self.writer is not None:
+            if self.output_path is not None and Path(output_path) != self.output_path:
+                self.output_path = self.output_path.replace(output_path)
+            return output_path if self.frames_recorded else None
+        if self.buffer is not None and len(self.buffer):
+            file_format, subtype = soundfile_options(output_path)
+            return self.buffer.write_to(output_path, subtype=subtype, format=file_format)
         return None
 
 
@@ -270,5 +451,12 @@ def record(
         typer.echo(f"Error: {e}")
 
 
+@app.command()
+def transcode(directory: str = "data", format: str = FORMAT_FLAC):
+    # Compress finished WAV recordings to FLAC or Ogg/Opus
+    transcoded = transcode_recordings(directory, format)
+    typer.echo(f"Transcoded {len(transcoded)} recording(s)")
+
+
 if __name__ == "__main__":
     app()
\ No newline at end of file
@@ -0,0 +1,116 @@
+from typing import Optional
+
+import numpy as np
+
+
+class BlockBuffer:
+    """
+    Append-only sample store for the audio callback. Samples are copied into
+    large preallocated NumPy blocks, so a callback only does a slice
+    assignment; a new block is allocated once every few minutes of audio.
+    Block sizes double from `initial_seconds` up to `max_block_seconds`.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        channels: Optional[int] = None,
+        dtype=np.float32,
+        initial_seconds: float = 120.0,
+        max_block_seconds: float = 600.0,
+    ):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.dtype = np.dtype(dtype)
+        self._initial_frames = max(1, int(initial_seconds * sample_rate))
+        self._next_frames = self._initial_frames
+        self._max_frames = max(self._initial_frames, int(max_block_seconds * sample_rate))
+        self._blocks = []
+        self._filled = 0
+        self._frames = 0
+
+    def __len__(self):
+        return self._frames
+
+    @property
+    def duration(self) -> float:
+        return self._frames / self.sample_rate
+
+    @property
+    def capacity(self) -> int:
+        return sum(len(block) for block in self._blocks)
+
+    def _shape(self, frames):
+        return (frames,) if self.channels is None else (frames, self.channels)
+
+    def _grow(self):
+        self._blocks.append(np.empty(self._shape(self._next_frames), dtype=self.dtype))
+        self._filled = 0
+        self._next_frames = min(self._next_frames * 2, self._max_frames)
+
+    def write(self, data: np.ndarray):
+        """
+        Copy `data` into the buffer and return a view of where it landed, or
+        a short list of views when it straddles two blocks. Views stay valid
+        until clear(), so they can be handed to other threads without a copy.
+        """
+        frames = len(data)
+        if not self._blocks or self._filled == len(self._blocks[-1]):
+            self._grow()
+
+        block = self._blocks[-1]
+        space = len(block) - self._filled
+        if frames <= space:
+            target = block[self._filled : self._filled + frames]
+            target[...] = data
+            self._filled += frames
+            self._frames += frames
+            return target
+
+        # Rare path: the block is full after this write
+        head = self.write(data[:space])
+        return [head, self.write(data[space:])]
+
+    def chunks(self):
+        """Yield zero-copy views of the recorded samples, block by block."""
+        for index, block in enumerate(self._blocks):
+            filled = self._filled if index == len(self._blocks) - 1 else len(block)
+            if filled:
+                yield block[:filled]
+
+    def view(self) -> Optional[np.ndarray]:
+        """
+        The whole recording as one array. Zero-copy while it fits in one
+        block; otherwise the blocks are consolidated once and later calls
+        are free again.
+        """
+        if not self._frames:
+            return None
+        if len(self._blocks) > 1:
+            merged = np.concatenate(list(self.chunks()), axis=0)
+            self._blocks = [merged]
+            self._filled = len(merged)
+        return self._blocks[0][: self._filled]
+
+    def write_to(self, path, subtype: Optional[str] = None, format: Optional[str] = None):
+        """Stream the blocks into an audio file without building one big array."""
+        import soundfile as sf
+
+        channels = 1 if self.channels is None else self.channels
+        with sf.SoundFile(
+            str(path),
+            mode="w",
+            samplerate=self.sample_rate,
+            channels=channels,
+            subtype=subtype,
+            format=format,
+        ) as f:
+            for chunk in self.chunks():
+                f.write(chunk)
+        return path
+
+    def clear(self):
+        self._next_frames = self._initial_frames
+        self._blocks = []
+        self._filled = 0
+        self._frames = 0
@@ -0,0 +1,114 @@
+# Small DSP helpers for converting captured audio to Whisper's input format
+from math import gcd
+
+import numpy as np
+
+SPEECH_SAMPLE_RATE = 16000
+
+
+def downmix(block: np.ndarray) -> np.ndarray:
+    # Average all channels into one
+    if block.ndim == 1:
+        return block
+    if block.shape[1] == 1:
+        return block[:, 0]
+    return block.mean(axis=1, dtype=np.float32)
+
+
+def float_to_int16(block: np.ndarray) -> np.ndarray:
+    return (np.clip(block, -1.0, 1.0) * 32767.0).astype(np.int16)
+
+
+def int16_to_float(block: np.ndarray) -> np.ndarray:
+    return block.astype(np.float32) / 32768.0
+
+
+def design_lowpass(up: int, down: int, half_width: int = 10, beta: float = 5.0) -> np.ndarray:
+    """Kaiser-windowed sinc for rational resampling by up/down, with unit passband gain."""
+    rate = max(up, down)
+    n_taps = 2 * half_width * rate + 1
+    t = np.arange(n_taps) - (n_taps - 1) / 2
+    taps = np.sinc(t / rate) * np.kaiser(n_taps, beta)
+    return (taps * (up / rate)).astype(np.float32)
+
+
+class StreamResampler:
+    """
+    Polyphase FIR resampler that keeps state between blocks, so a stream can
+    be converted block by block with the same output as converting it whole.
+    """
+
+    def __init__(self, in_rate: int, out_rate: int = SPEECH_SAMPLE_RATE):
+        divisor = gcd(int(in_rate), int(out_rate))
+        self.up = int(out_rate) // divisor
+        self.down = int(in_rate) // divisor
+        self.passthrough = self.up == self.down
+
+        taps = design_lowpass(self.up, self.down)
+        self.delay = (len(taps) - 1) // 2
+        n_phase_taps = -(-len(taps) // self.up)
+        padded = np.zeros(n_phase_taps * self.up, dtype=np.float32)
+        padded[: len(taps)] = taps
+        # polyphase[phase, k] = taps[k * up + phase]
+        self.polyphase = padded.reshape(n_phase_taps, self.up).T.copy()
+        self.n_phase_taps = n_phase_taps
+
+        # History starts with zeros so the first outputs see silence before the stream
+        self._history = np.zeros(n_phase_taps, dtype=np.float32)
+        self._history_start = -n_phase_taps
+        self._next_out = 0
+        self._consumed = 0
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        block = np.asarray(block, dtype=np.float32)
+        if self.passthrough:
+            self._consumed += len(block)
+            return block
+
+        self._consumed += len(block)
+        history = np.concatenate([self._history, block])
+        end = self._history_start + len(history)
+
+        # Last output whose newest input sample is already available
+        last_out = (end * self.up - 1 - self.delay) // self.down
+        if last_out < self._next_out:
+            self._history = history
+            return np.zeros(0, dtype=np.float32)
+
+        n = np.arange(self._next_out, last_out + 1, dtype=np.int64)
+        t = n * self.down + self.delay
+        newest = t // self.up
+        phase = t % self.up
+        idx = newest[:, None] - np.arange(self.n_phase_taps)[None, :] - self._history_start
+        out = np.einsum("ij,ij->i", self.polyphase[phase], history[idx])
+
+        self._next_out = int(last_out) + 1
+        # Keep only what future outputs can still reach
+        first_needed = (self._next_out * self.down + self.delay) // self.up - self.n_phase_taps + 1
+        keep_from = max(0, first_needed - self._history_start)
+        self._history = history[keep_from:]
+        self._history_start += keep_from
+        return out.astype(np.float32)
+
+    def flush(self) -> np.ndarray:
+        """Emit the tail held back by the filter delay, trimmed to the exact output length."""
+        if self.passthrough:
+            return np.zeros(0, dtype=np.float32)
+        total_out = -(-self._consumed * self.up // self.down)
+        remaining = total_out - self._next_out
+        if remaining <= 0:
+            return np.zeros(0, dtype=np.float32)
+        tail = self.process(np.zeros(self.n_phase_taps * 2 + self.down, dtype=np.float32))
+        return tail[:remaining]
+
+
+def resample(audio: np.ndarray, in_rate: int, out_rate: int = SPEECH_SAMPLE_RATE) -> np.ndarray:
+    """Resample a whole mono array with the polyphase filter."""
+    if int(in_rate) == int(out_rate):
+        return np.asarray(audio, dtype=np.float32)
+    resampler = StreamResampler(in_rate, out_rate)
+    # Blockwise keeps the gathered filter windows small for long recordings
+    block = 1 << 18
+    parts = [resampler.process(audio[i : i + block]) for i in range(0, len(audio), block)]
+    parts.append(resampler.flush())
+    return np.concatenate(parts)
@@ -0,0 +1,110 @@
+# Container/codec choices for recordings written through soundfile
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Tuple
+
+FORMAT_WAV = "wav"
+FORMAT_FLAC = "flac"
+FORMAT_OPUS = "opus"
+
+# name -> (suffix, soundfile format, subtype)
+RECORDING_FORMATS = {
+    FORMAT_WAV: (".wav", "WAV", None),
+    FORMAT_FLAC: (".flac", "FLAC", "PCM_16"),
+    FORMAT_OPUS: (".ogg", "OGG", "OPUS"),
+}
+
+# libopus only encodes at these rates
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+
+@lru_cache(maxsize=None)
+def opus_supported() -> bool:
+    # Opus needs libsndfile 1.0.29 or newer
+    import soundfile as sf
+
+    return "OPUS" in sf.available_subtypes("OGG")
+
+
+def resolve_format(name: Optional[str], sample_rate: int) -> str:
+    """Return a format that can actually be written at `sample_rate`, falling back to FLAC."""
+    name = (name or FORMAT_FLAC).lower()
+    if name not in RECORDING_FORMATS:
+        return FORMAT_FLAC
+    if name == FORMAT_OPUS and (sample_rate not in OPUS_SAMPLE_RATES or not opus_supported()):
+        return FORMAT_FLAC
+    return name
+
+
+def recording_suffix(name: Optional[str], sample_rate: int) -> str:
+    return RECORDING_FORMATS[resolve_format(name, sample_rate)][0]
+
+
+def soundfile_options(path) -> Tuple[Optional[str], Optional[str]]:
+    """(format, subtype) for writing `path`, chosen from its suffix."""
+    suffix = Path(path).suffix.lower()
+    for file_suffix, file_format, subtype in RECORDING_FORMATS.values():
+        if suffix == file_suffix:
+            return file_format, subtype
+    return None, None
+
+
+def transcode(path, name: str = FORMAT_FLAC, block_frames: int = 1 << 16, delete_source: bool = True) -> Optional[Path]:
+    """
+    Re-encode a recording block by block, so memory use doesn't depend on its
+    length. The source is only removed once the new file has every frame.
+    """
+    import soundfile as sf
+
+    path = Path(path)
+    with sf.SoundFile(str(path)) as source:
+        name = resolve_format(name, source.samplerate)
+        suffix, file_format, subtype = RECORDING_FORMATS[name]
+        target_path = path.with_suffix(suffix)
+        if target_path == path or target_path.exists():
+            return None
+        dtype = "int16" if source.subtype == "PCM_16" else "float32"
+        if file_format == "FLAC" and dtype == "float32":
+            # Keep more of a float source's resolution than 16 bits
+            subtype = "PCM_24"
+        temp_path = path.with_name(f"{path.stem}.transcoding{suffix}")
+        with sf.SoundFile(
+            str(temp_path),
+            mode="w",
+            samplerate=source.samplerate,
+            channels=source.channels,
+            format=file_format,
+            subtype=subtype,
+        ) as target:
+            for block in source.blocks(blocksize=block_frames, dtype=dtype, always_2d=True):
+                target.write(block)
+        expected_frames = source.frames
+
+    if sf.info(str(temp_path)).frames != expected_frames:
+        temp_path.unlink(missing_ok=True)
+        raise RuntimeError(f"Transcoding {path.name} lost frames")
+    temp_path.replace(target_path)
+    if delete_source:
+        path.unlink()
+    return target_path
+
+
+def transcode_recordings(directory, name: str = FORMAT_FLAC, should_stop=None) -> list:
+    """Transcode finished WAV recordings in `directory`, skipping any that are still being written."""
+    from .writer import PARTIAL_SUFFIX
+
+    transcoded = []
+    for path in sorted(Path(directory).glob("*.wav")):
+        if should_stop is not None and should_stop():
+            break
+        if path.with_name(path.name + PARTIAL_SUFFIX).exists():
+            continue
+        try:
+            target = transcode(path, name)
+        except Exception as exc:
+            print(f"Could not transcode {path.name}: {exc}")
+            continue
+        if target is not None:
+            print(f"Transcoded {path.name} -> {target.name}")
+            transcoded.append(target)
+    return transcoded
@@ -0,0 +1,107 @@
+import json
+from pathlib import Path
+
+import numpy as np
+
+
+class CallbackTelemetry:
+    """
+    Health counters for the PortAudio input callback. record() runs inside the
+    callback, so it only bumps counters and writes into a preallocated ring of
+    callback durations; percentiles are computed when snapshot() is called.
+    """
+
+    def __init__(self, sample_rate: int, history: int = 1 << 16, gap_tolerance: float = 1.5):
+        self.sample_rate = sample_rate
+        self.gap_tolerance = gap_tolerance
+        self._durations = np.zeros(history, dtype=np.float64)
+        self.callbacks = 0
+        self.frames = 0
+        self.input_overflows = 0
+        self.input_underflows = 0
+        self.max_callback_seconds = 0.0
+        self.gaps = 0
+        self.gap_seconds = 0.0
+        self.max_gap_seconds = 0.0
+        self._last_adc_time = None
+        self._last_frames = 0
+
+    def record(self, status, time_info, frames: int, duration: float):
+        self._durations[self.callbacks % len(self._durations)] = duration
+        self.callbacks += 1
+        self.frames += frames
+        if duration > self.max_callback_seconds:
+            self.max_callback_seconds = duration
+
+        if status:
+            if getattr(status, "input_overflow", False):
+                self.input_overflows += 1
+            if getattr(status, "input_underflow", False):
+                self.input_underflows += 1
+
+        # Some host APIs report 0 for every timestamp; only trust increasing values
+        adc_time = getattr(time_info, "inputBufferAdcTime", None)
+        if adc_time:
+            if self._last_adc_time is not None and self._last_frames:
+                expected = self._last_frames / self.sample_rate
+                gap = (adc_time - self._last_adc_time) - expected
+                if gap > expected * (self.gap_tolerance - 1.0):
+                    self.gaps += 1
+                    self.gap_seconds += gap
+                    self.max_gap_seconds = max(self.max_gap_seconds, gap)
+            self._last_adc_time = adc_time
+            self._last_frames = frames
+
+    def duration_percentiles(self) -> dict:
+        count = min(self.callbacks, len(self._durations))
+        if not count:
+            return {}
+        values = self._durations[:count] * 1000.0
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        return {"p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99)}
+
+    @property
+    def budget_seconds(self) -> float:
+        # Time between callbacks; a callback that takes longer risks an overflow
+        return self.frames / self.callbacks / self.sample_rate if self.callbacks else 0.0
+
+    def snapshot(self) -> dict:
+        return {
+            "callbacks": self.callbacks,
+            "frames": self.frames,
+            "input_overflows": self.input_overflows,
+            "input_underflows": self.input_underflows,
+            "callback_ms": {
+                **self.duration_percentiles(),
+                "max_ms": self.max_callback_seconds * 1000.0,
+                "budget_ms": self.budget_seconds * 1000.0,
+            },
+            "time_gaps": {
+                "count": self.gaps,
+                "total_seconds": self.gap_seconds,
+                "max_seconds": self.max_gap_seconds,
+            },
+        }
+
+
+def summarize_metrics(metrics: dict) -> str:
+    """One line for the GUI status, or an empty string while everything is healthy."""
+    problems = []
+    if metrics.get("writer_error"):
+        problems.append(f"writing to disk failed ({metrics['writer_error']})")
+    if metrics.get("input_overflows"):
+        problems.append(f"{metrics['input_overflows']} input overflow(s)")
+    dropped = metrics.get("high_water", {}).get("dropped_blocks", 0)
+    if dropped:
+        problems.append(f"{dropped} dropped block(s)")
+    gaps = metrics.get("time_gaps", {}).get("count", 0)
+    if gaps:
+        problems.append(f"{gaps} gap(s) in the stream")
+    return "Audio glitches: " + ", ".join(problems) if problems else ""
+
+
+def write_metrics(path, metrics: dict) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(metrics, indent=2), encoding="utf-8")
+    return path
@@ -0,0 +1,319 @@
+import queue
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+
+from .formats import soundfile_options
+
+PARTIAL_SUFFIX = ".partial"
+
+_STOP = object()
+
+
+class StreamingWriter:
+    """
+    Appends audio blocks to an open SoundFile from a background thread. The
+    audio callback only enqueues; the writer thread does the disk I/O and
+    flushes every `flush_seconds`. Memory use is bounded by the queue size
+    no matter how long the recording runs.
+
+    A `<file>.partial` marker exists while the file is open, so a recording
+    interrupted by a crash can be found and repaired with recover_recordings().
+    """
+
+    def __init__(
+        self,
+        path,
+        sample_rate: int,
+        channels: int = 1,
+        subtype: Optional[str] = None,
+        max_queued_blocks: int = 2048,
+        flush_seconds: float = 5.0,
+    ):
+        self.path = Path(path)
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.subtype = subtype
+        self.flush_seconds = flush_seconds
+        self.frames_written = 0
+        self.dropped_blocks = 0
+        self.max_queue_depth = 0
+        self._queue = queue.Queue(maxsize=max_queued_blocks)
+        self._thread = None
+        self._error = None
+        self._file = None
+
+    @property
+    def error(self) -> Optional[BaseException]:
+        """Why the writer thread stopped early, if it did."""
+        return self._error
+
+    @property
+    def marker_path(self) -> Path:
+        return self.path.with_name(self.path.name + PARTIAL_SUFFIX)
+
+    def _open(self):
+        import soundfile as sf
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.marker_path.touch()
+        # The suffix picks the container: .wav, .flac or .ogg (Opus)
+        file_format, subtype = soundfile_options(self.path)
+        self._file = sf.SoundFile(
+            str(self.path),
+            mode="w",
+            samplerate=self.sample_rate,
+            channels=self.channels,
+            format=file_format,
+            subtype=self.subtype or subtype,
+        )
+
+    def start(self):
+        # Open on the caller's thread so a bad path or format fails immediately
+        self._open()
+        self._thread = threading.Thread(target=self._run, name="recording-writer", daemon=True)
+        self._thread.start()
+        return self
+
+    def write(self, block: np.ndarray) -> bool:
+        """Queue a block from the audio callback. Never blocks; returns False if it was dropped."""
+        if self._error is not None:
+            # The writer thread is gone; nothing queued now would reach the file
+            self.dropped_blocks += 1
+            return False
+        try:
+            self._queue.put_nowait(block)
+        except queue.Full:
+            self.dropped_blocks += 1
+            return False
+        depth = self._queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+        return True
+
+    def _run(self):
+        last_flush = time.monotonic()
+        try:
+            while True:
+                try:
+                    block = self._queue.get(timeout=self.flush_seconds)
+                except queue.Empty:
+                    block = None
+
+                if block is _STOP:
+                    break
+                if block is not None:
+                    self._write_block(block)
+
+                now = time.monotonic()
+                if now - last_flush >= self.flush_seconds:
+                    self._file.flush()
+                    last_flush = now
+        except Exception as exc:
+            print(f"Recording writer error: {exc}")
+            self._error = exc
+
+    def _write_block(self, block):
+        self._file.write(block)
+        self.frames_written += len(block)
+
+    def close(self) -> Path:
+        """Drain the queue, finalize the file header and remove the partial marker."""
+        if self._thread is not None:
+            # The sentinel must not be dropped when the queue is full, but a dead
+            # writer thread will never make room for it
+            while self._thread.is_alive():
+                try:
+                    self._queue.put(_STOP, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+            self._thread.join()
+            self._thread = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._error is not None:
+            raise RuntimeError(f"Writing {self.path} failed: {self._error}") from self._error
+        self.marker_path.unlink(missing_ok=True)
+        return self.path
+
+
+def block_level_db(block: np.ndarray) -> float:
+    samples = np.asarray(block, dtype=np.float32)
+    if block.dtype == np.int16:
+        samples = samples / 32768.0
+    return float(10.0 * np.log10(np.mean(samples * samples) + 1e-12))
+
+
+class SegmentedWriter(StreamingWriter):
+    """
+    A StreamingWriter that rolls over to a new file every `segment_seconds`.
+    Once a segment is long enough it is cut on the next quiet block (or after
+    `grace_seconds` at the latest), so words aren't split across files.
+    `on_segment(path, index, start_seconds)` runs on the writer thread for
+    every finished segment, including the last one when the writer closes.
+    """
+
+    def __init__(
+        self,
+        path,
+        sample_rate: int,
+        segment_seconds: float,
+        on_segment: Optional[Callable[[Path, int, float], None]] = None,
+        grace_seconds: float = 10.0,
+        **kwargs,
+    ):
+        super().__init__(path, sample_rate, **kwargs)
+        self.base_path = Path(path)
+        self.segment_frames = max(1, int(segment_seconds * sample_rate))
+        self.grace_frames = int(grace_seconds * sample_rate)
+        self.on_segment = on_segment
+        self.segment_paths = []
+        self._segment_start = 0
+        self._levels = []
+        self._quiet_db = None
+        self.path = self._segment_path(0)
+
+    def _segment_path(self, index: int) -> Path:
+        return self.base_path.with_name(f"{self.base_path.stem}_part{index + 1:03d}{self.base_path.suffix}")
+
+    def _write_block(self, block):
+        super()._write_block(block)
+        self._levels.append(block_level_db(block))
+        in_segment = self.frames_written - self._segment_start
+        if in_segment < self.segment_frames:
+            return
+        if self._quiet_db is None:
+            # Anything near the quietest tenth of this segment counts as a pause
+            self._quiet_db = float(np.percentile(self._levels, 10)) + 6.0
+        if self._levels[-1] <= self._quiet_db or in_segment >= self.segment_frames + self.grace_frames:
+            self._file.close()
+            self.marker_path.unlink(missing_ok=True)
+            self._finish_segment()
+            self._open()
+
+    def _finish_segment(self):
+        finished = self.path
+        index = len(self.segment_paths)
+        start_seconds = self._segment_start / self.sample_rate
+        self.segment_paths.append(finished)
+
+        self._segment_start = self.frames_written
+        self._levels = []
+        self._quiet_db = None
+        self.path = self._segment_path(index + 1)
+        if self.on_segment is not None:
+            try:
+                self.on_segment(finished, index, start_seconds)
+            except Exception as exc:
+                print(f"Segment handler error: {exc}")
+
+    def close(self) -> Path:
+        super().close()
+        if self.frames_written > self._segment_start:
+            self._finish_segment()
+        else:
+            # Rolled over right before stopping; drop the empty file
+            self.path.unlink(missing_ok=True)
+        return self.base_path
+
+
+def repair_wav_header(path) -> bool:
+    """
+    Rewrite the RIFF and data chunk sizes of a WAV whose header was never
+    finalized, so every complete frame on disk becomes readable again.
+    """
+    path = Path(path)
+    with open(path, "r+b") as f:
+        header = f.read(12)
+        if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+            return False
+
+        file_size = path.stat().st_size
+        block_align = 1
+        offset = 12
+        while offset + 8 <= file_size:
+            f.seek(offset)
+            chunk_id, chunk_size = struct.unpack("<4sI", f.read(8))
+            if chunk_id == b"fmt ":
+                fmt = f.read(16)
+                block_align = max(1, struct.unpack("<H", fmt[12:14])[0])
+            elif chunk_id == b"data":
+                data_start = offset + 8
+                data_size = file_size - data_start
+                data_size -= data_size % block_align
+                f.seek(offset + 4)
+                f.write(struct.pack("<I", data_size))
+                f.seek(4)
+                f.write(struct.pack("<I", data_start + data_size - 8))
+                return True
+            offset += 8 + chunk_size + (chunk_size & 1)
+    return False
+
+
+def repair_stream(path, block_frames: int = 4096) -> bool:
+    """
+    Re-encode a FLAC or Ogg file that was never finalized. Its frames decode
+    fine, but the unknown length makes libsndfile fail at the end of the
+    data, so copy frames until that happens.
+    """
+    import soundfile as sf
+
+    path = Path(path)
+    fixed_path = path.with_name(path.stem + ".recovered" + path.suffix)
+    frames = 0
+    with sf.SoundFile(str(path)) as source:
+        out = np.empty((block_frames, source.channels), dtype=np.int16)
+        with sf.SoundFile(
+            str(fixed_path),
+            mode="w",
+            samplerate=source.samplerate,
+            channels=source.channels,
+            format=source.format,
+            subtype=source.subtype,
+        ) as target:
+            while True:
+                try:
+                    count = source.buffer_read_into(out, dtype="int16")
+                except sf.LibsndfileError:
+                    break
+                if not count:
+                    break
+                target.write(out[:count])
+                frames += count
+    fixed_path.replace(path)
+    return frames > 0
+
+
+def interrupted_markers(directory) -> list:
+    return sorted(Path(directory).glob(f"*{PARTIAL_SUFFIX}"))
+
+
+def recover_recordings(directory, markers: Optional[list] = None) -> list:
+    """
+    Repair recordings left behind by a crash and return their paths. Pass
+    `markers` from interrupted_markers() taken before capture can start, so a
+    recording begun meanwhile isn't mistaken for an interrupted one.
+    """
+    recovered = []
+    for marker in interrupted_markers(directory) if markers is None else markers:
+        audio_path = marker.with_name(marker.name[: -len(PARTIAL_SUFFIX)])
+        if not audio_path.exists():
+            marker.unlink(missing_ok=True)
+            continue
+        try:
+            suffix = audio_path.suffix.lower()
+            if suffix == ".wav":
+                repair_wav_header(audio_path)
+            elif suffix in (".flac", ".ogg"):
+                repair_stream(audio_path)
+            recovered.append(audio_path)
+            marker.unlink(missing_ok=True)
+        except Exception as exc:
+            print(f"Could not recover {audio_path}: {exc}")
+    return recovered
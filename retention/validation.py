@@ -1,4 +1,5 @@
 import os
+import struct
 from pathlib import Path
 from typing import Optional
 
@@ -7,7 +8,7 @@ from dotenv import load_dotenv
 
 app = typer.Typer()
 
-allowed_extensions = [".mp3", ".mp4", ".wav", ".m4a"]
+allowed_extensions = [".mp3", ".mp4", ".wav", ".m4a", ".flac", ".ogg"]
 
 load_dotenv()
 
@@ -82,25 +83,234 @@ def validate_file_type(file_path: Path) -> bool:
     return False
 
 
-def validate_file_size(file_size: Path) -> bool:
+MIN_DURATION_SECONDS = 4.0
+MAX_DURATION_SECONDS = 24 * 3600.0
+
+
+# --- Header-only media probing ----------------------------------------------
+
+_MP4_CONTAINERS = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+_MP4_CODECS = {b"mp4a": "aac", b"ac-3": "ac3", b"ec-3": "eac3", b"Opus": "opus", b"fLaC": "flac", b"alac": "alac", b".mp3": "mp3"}
+
+# MPEG audio header tables, indexed by version bits (3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5)
+_MP3_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+_MP3_BITRATES_V1_L3 = (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320)
+_MP3_BITRATES_V2_L3 = (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)
+
+
+def _read_box_header(f, end: int):
+    # Returns (type, payload_start, box_end) or None at the end of the parent
+    start = f.tell()
+    if start + 8 > end:
+        return None
+    header = f.read(8)
+    if len(header) < 8:
+        return None
+    size, box_type = struct.unpack(">I4s", header)
+    payload = start + 8
+    if size == 1:
+        size = struct.unpack(">Q", f.read(8))[0]
+        payload += 8
+    elif size == 0:
+        size = end - start
+    if size < payload - start:
+        return None
+    return box_type, payload, min(start + size, end)
+
+
+def _probe_mp4(path: Path) -> dict:
+    """Walk MP4/M4A atoms to the first sound track without reading any media data."""
+    file_end = path.stat().st_size
+    info = {}
+    with open(path, "rb") as f:
+
+        def walk(end, track):
+            while True:
+                box = _read_box_header(f, end)
+                if box is None:
+                    return
+                box_type, payload, box_end = box
+                if box_type in _MP4_CONTAINERS:
+                    child = {} if box_type == b"trak" else track
+                    walk(box_end, child)
+                    if box_type == b"trak" and child.get("handler") == b"soun" and "codec" not in info:
+                        info.update(child)
+                elif box_type == b"mvhd":
+                    version = f.read(1)[0]
+                    f.seek(payload + (20 if version == 1 else 12))
+                    if version == 1:
+                        timescale, duration = struct.unpack(">IQ", f.read(12))
+                    else:
+                        timescale, duration = struct.unpack(">II", f.read(8))
+                    if timescale:
+                        info.setdefault("movie_duration", duration / timescale)
+                elif box_type == b"mdhd":
+                    version = f.read(1)[0]
+                    f.seek(payload + (20 if version == 1 else 12))
+                    if version == 1:
+                        timescale, duration = struct.unpack(">IQ", f.read(12))
+                    else:
+                        timescale, duration = struct.unpack(">II", f.read(8))
+                    if timescale:
+                        track["duration"] = duration / timescale
+                        track["sample_rate"] = timescale
+                elif box_type == b"hdlr":
+                    f.seek(payload + 8)
+                    track["handler"] = f.read(4)
+                elif box_type == b"stsd" and track.get("handler") == b"soun":
+                    # Full box header + entry count, then the first AudioSampleEntry
+                    f.seek(payload + 8)
+                    entry = f.read(36)
+                    if len(entry) == 36:
+                        track["codec"] = _MP4_CODECS.get(entry[4:8], entry[4:8].decode("latin-1").strip())
+                        track["channels"] = struct.unpack(">H", entry[24:26])[0]
+                        rate = struct.unpack(">I", entry[32:36])[0] >> 16
+                        if rate:
+                            track["sample_rate"] = rate
+                f.seek(box_end)
+
+        walk(file_end, info)
+
+    if "codec" not in info:
+        raise ValueError("no audio track found")
+    duration = info.get("duration", info.get("movie_duration"))
+    return {
+        "container": "mp4",
+        "codec": info["codec"],
+        "duration": duration,
+        "sample_rate": info.get("sample_rate"),
+        "channels": info.get("channels"),
+    }
+
+
+def _probe_mp3(path: Path) -> dict:
+    """Read the first MPEG audio frame (and a Xing/Info header if present)."""
+    file_size = path.stat().st_size
+    with open(path, "rb") as f:
+        head = f.read(10)
+        start = 0
+        if head[:3] == b"ID3" and len(head) == 10:
+            # Syncsafe tag size, 7 bits per byte
+            size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+            start = 10 + size
+        f.seek(start)
+        data = f.read(64 * 1024)
+
+    for i in range(len(data) - 4):
+        if data[i] != 0xFF or (data[i + 1] & 0xE0) != 0xE0:
+            continue
+        b1, b2, b3 = data[i + 1], data[i + 2], data[i + 3]
+        version = (b1 >> 3) & 0x3
+        layer = (b1 >> 1) & 0x3
+        bitrate_index = b2 >> 4
+        rate_index = (b2 >> 2) & 0x3
+        if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+            continue  # only Layer III, and not a free-format or reserved header
+        sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+        bitrates = _MP3_BITRATES_V1_L3 if version == 3 else _MP3_BITRATES_V2_L3
+        bitrate = bitrates[bitrate_index] * 1000
+        channels = 1 if (b3 >> 6) == 3 else 2
+        samples_per_frame = 1152 if version == 3 else 576
+
+        # VBR files carry a frame count in a Xing/Info header inside the first frame
+        side_info = (32 if channels == 2 else 17) if version == 3 else (17 if channels == 2 else 9)
+        xing = i + 4 + side_info
+        duration = None
+        if data[xing : xing + 4] in (b"Xing", b"Info"):
+            flags = struct.unpack(">I", data[xing + 4 : xing + 8])[0]
+            if flags & 0x1:
+                frames = struct.unpack(">I", data[xing + 8 : xing + 12])[0]
+                duration = frames * samples_per_frame / sample_rate
+        if duration is None:
+            duration = (file_size - start - i) * 8 / bitrate
+        return {
+            "container": "mp3",
+            "codec": "mp3",
+            "duration": duration,
+            "sample_rate": sample_rate,
+            "channels": channels,
+        }
+    raise ValueError("no MPEG audio frame found")
+
+
+def _probe_soundfile(path: Path) -> dict:
+    import soundfile as sf
+
+    info = sf.info(str(path))
+    codec = "flac" if info.format == "FLAC" else info.subtype.lower()
+    return {
+        "container": info.format.lower(),
+        "codec": codec,
+        "duration": info.duration,
+        "sample_rate": info.samplerate,
+        "channels": info.channels,
+    }
+
+
+def probe_media(file_path: Path) -> dict:
+    """
+    Read container headers only and return duration (seconds), sample_rate,
+    channels, codec and container. Takes milliseconds even for multi-GB
+    files. Raises ValueError for files that can't be read as audio.
+    """
+    path = Path(file_path)
+    suffix = path.suffix.lower()
     try:
-        size = file_size.stat().st_size
+        if suffix in (".mp4", ".m4a"):
+            info = _probe_mp4(path)
+        elif suffix == ".mp3":
+            info = _probe_mp3(path)
+        else:
+            info = _probe_soundfile(path)
     except FileNotFoundError:
-        typer.echo("File not found")
-        return False
+        raise
+    except (OSError, ValueError, struct.error, IndexError, RuntimeError) as exc:
+        raise ValueError(f"{path.name} is not readable audio: {exc}") from exc
+    if not info.get("duration") or not info.get("channels"):
+        raise ValueError(f"{path.name} has no readable audio stream")
+    return info
 
-    if size < 1024 * 1024:
-        typer.echo("file size is less than 1 MB")
-        return False
-    if size > 1024 * 1024 * 1024:
-        typer.echo("file size is greater than 1 GB")
+
+def describe_media(info: dict) -> str:
+    minutes, seconds = divmod(int(round(info["duration"])), 60)
+    hours, minutes = divmod(minutes, 60)
+    length = f"{hours}h{minutes:02d}m" if hours else f"{minutes}m{seconds:02d}s"
+    return f"{length} of {info['codec']} audio, {info['sample_rate']} Hz, {info['channels']} channel(s)"
+
+
+def media_problem(file_path: Path) -> Optional[str]:
+    """Why a file can't be processed, or None if it can. Decoding is windowed, so size doesn't matter."""
+    try:
+        info = probe_media(file_path)
+    except FileNotFoundError:
+        return "File not found"
+    except ValueError as exc:
+        return str(exc)
+
+    if info["duration"] < MIN_DURATION_SECONDS:
+        return f"Audio is shorter than {MIN_DURATION_SECONDS:.0f} seconds"
+    if info["duration"] > MAX_DURATION_SECONDS:
+        return f"Audio is longer than {MAX_DURATION_SECONDS / 3600:.0f} hours"
+    return None
+
+
+def validate_media(file_path: Path) -> bool:
+    problem = media_problem(file_path)
+    if problem:
+        typer.echo(problem)
         return False
     return True
 
 
+@app.command("probe")
+def probe(file_path: Path):
+    info = probe_media(file_path)
+    typer.echo(f"{info['container']}: {describe_media(info)}")
+
+
 @app.command("validate_file")
 def validate_file(file_path: Path):
-    if validate_api_key() and validate_file_type(file_path) and validate_file_size(file_path):
+    if validate_api_key() and validate_file_type(file_path) and validate_media(file_path):
         return True
     return False
 
@@ -6,12 +6,14 @@ block_cipher = None
 
 tiktoken_datas = collect_data_files('tiktoken', includes=['*.tiktoken', '*.json'])
 whisper_datas = collect_data_files('whisper', includes=['assets/*'])
+# Speech clip for `--model auto` calibration
+calibration_datas = [('retention/asr/assets', 'retention/asr/assets')]
 
 a = Analysis(
     ['run_gui.py'],
     pathex=[],
     binaries=[],
-    datas=[('data', 'data')] + tiktoken_datas + whisper_datas,
+    datas=[('data', 'data')] + tiktoken_datas + whisper_datas + calibration_datas,
     hiddenimports=[
         'PySide6.QtCore',
         'PySide6.QtWidgets',
@@ -34,6 +36,7 @@ a = Analysis(
         'retention.gui.windows',
         'retention.gui.components',
         'retention.gui.utils',
+        'retention.gui.workers',
         'retention.asr',
         'retention.nlp',
         'retention.recording',
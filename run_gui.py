@@ -3,6 +3,7 @@
 Simple launcher script for the Summit - AI Learning Accelerator GUI.
 """
 
+import multiprocessing
 import sys
 import os
 
@@ -13,5 +14,7 @@ sys.path.insert(0, project_root)
 from retention.gui.main import main
 
 if __name__ == "__main__":
+    # Transcription workers are spawned processes; frozen builds need this first
+    multiprocessing.freeze_support()
     main()
     
\ No newline at end of file